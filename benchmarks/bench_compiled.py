@@ -0,0 +1,52 @@
+"""
+Compare the interpretive and compiled resolution of per-request scopes.
+
+Every iteration creates a scope from a PytelTemplate and resolves all of its services,
+so the factories run once per scope, like transient services would.
+
+    python benchmarks/bench_compiled.py
+"""
+import timeit
+
+from pytel import PytelTemplate
+
+
+class Service:
+    def __init__(self, **deps):
+        self.deps = deps
+
+
+def lattice(width: int, depth: int) -> dict:
+    """
+    depth layers of width services, each depending on every service of the previous layer
+    """
+    result = {}
+    for layer in range(depth):
+        for i in range(width):
+            params = ', '.join(f's{layer - 1}_{j}: Service' for j in range(width)) if layer else ''
+            args = ', '.join(f's{layer - 1}_{j}=s{layer - 1}_{j}' for j in range(width)) if layer else ''
+            namespace = {'Service': Service}
+            exec(f'def factory({params}) -> Service:\n    return Service({args})', namespace)
+            result[f's{layer}_{i}'] = namespace['factory']
+    return result
+
+
+def resolve(scopes: list) -> None:
+    for ctx in scopes:
+        ctx.warm_up(max_workers=1)
+
+
+def main(width: int = 8, depth: int = 12, number: int = 200, repeat: int = 5) -> None:
+    services = lattice(width, depth)
+    for compiled in (False, True):
+        template = PytelTemplate(services, compiled=compiled)
+        timings = []
+        for _ in range(repeat):
+            scopes = [template.create() for _ in range(number)]
+            timings.append(timeit.timeit(lambda: resolve(scopes), number=1))
+        best = min(timings) / number
+        print(f'{"compiled" if compiled else "interpretive":>12}: {best * 1e6:8.1f} us to resolve a scope of {len(template)} services')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Memory held by a context of many services, before and after resolving them,
+with and without releasing references to factories.
+
+    python benchmarks/bench_memory.py [services]
+"""
+import gc
+import sys
+import tracemalloc
+
+from pytel import Pytel
+
+
+class Service:
+    def __init__(self, payload: list):
+        self.payload = payload
+
+
+def services(count: int) -> dict:
+    def make_factory():
+        # each factory holds some configuration that is only needed to build the service
+        config = list(range(16))
+
+        def factory() -> Service:
+            return Service(config[:1])
+
+        return factory
+
+    return {f's{i}': make_factory() for i in range(count)}
+
+
+def measure(count: int, release_references: bool) -> None:
+    gc.collect()
+    tracemalloc.start()
+    ctx = Pytel(services(count), release_references=release_references)
+    gc.collect()
+    built, _ = tracemalloc.get_traced_memory()
+    ctx.warm_up(max_workers=1)
+    gc.collect()
+    resolved, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f'release_references={release_references!s:5}: {built / count:6.0f} B/service built, '
+          f'{resolved / count:6.0f} B/service resolved ({resolved / 2 ** 20:.1f} MiB total)')
+    ctx.close()
+
+
+def main(count: int = 100_000) -> None:
+    for release_references in (False, True):
+        measure(count, release_references)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,99 @@
+"""
+Synthetic service graphs for benchmarks.
+
+Each generator takes the number of services and returns a function building the contexts,
+together with the names of services to access in each of them.
+"""
+import functools
+import types
+import typing
+
+from pytel import Pytel
+
+Build = typing.Callable[[], typing.List[typing.Tuple[Pytel, typing.List[str]]]]
+
+
+class Service:
+    def __init__(self, *deps):
+        self.deps = deps
+
+
+@functools.lru_cache(maxsize=None)
+def _template(deps: typing.Tuple[str, ...], method: bool) -> types.FunctionType:
+    params = ', '.join((['self'] if method else []) + [f'{dep}: Service' for dep in deps])
+    namespace = {}
+    exec(f'def factory({params}) -> Service:\n    return Service({", ".join(deps)})', {'Service': Service}, namespace)
+    return namespace['factory']
+
+
+def factory(deps: typing.Sequence[str] = (), method: bool = False) -> typing.Callable[..., Service]:
+    """
+    :return: a new function object, so that every service has its own factory, like in real configurations
+    """
+    template = _template(tuple(deps), method)
+    result = types.FunctionType(template.__code__, template.__globals__)
+    result.__annotations__ = template.__annotations__
+    return result
+
+
+def fan_out(size: int) -> Build:
+    """
+    One shared service and size - 1 services depending on it.
+    """
+    services = {'s0': factory()}
+    services.update({f's{i}': factory(['s0']) for i in range(1, size)})
+    return lambda: [(Pytel(services), list(services.keys()))]
+
+
+def chain(size: int) -> Build:
+    """
+    Every service depends on the previous one, resolved from the last one.
+    """
+    services = {'s0': factory()}
+    services.update({f's{i}': factory([f's{i - 1}']) for i in range(1, size)})
+    return lambda: [(Pytel(services), [f's{size - 1}'])]
+
+
+def diamonds(size: int, width: int = 8) -> Build:
+    """
+    Layers of services, each depending on two services of the previous layer.
+    """
+    services = {}
+    for i in range(size):
+        layer, pos = divmod(i, width)
+        deps = [] if layer == 0 else sorted({f's{(layer - 1) * width + pos}', f's{(layer - 1) * width + (pos + 1) % width}'})
+        services[f's{i}'] = factory(deps)
+    last_layer = list(services.keys())[-width:]
+    return lambda: [(Pytel(services), last_layer)]
+
+
+def children(size: int) -> Build:
+    """
+    A parent context with one service and size child contexts, each with a service depending on it.
+    """
+    parent_services = {'base': factory()}
+    child_services = {'child': factory(['base'])}
+
+    def build():
+        parent = Pytel(parent_services)
+        return [(parent, ['base'])] + [(Pytel(child_services, parent=parent), ['child']) for _ in range(size)]
+
+    return build
+
+
+def configurer_object(size: int) -> Build:
+    """
+    A configurer class with size factory methods, each depending on the previous one in groups of ten.
+    """
+    attrs = {f's{i}': factory([] if i % 10 == 0 else [f's{i - 1}'], method=True) for i in range(size)}
+    configurer = type('Configurer', (), attrs)()
+    return lambda: [(Pytel(configurer), list(attrs.keys()))]
+
+
+SCENARIOS: typing.Dict[str, typing.Callable[[int], Build]] = {
+    'fan_out': fan_out,
+    'chain': chain,
+    'diamonds': diamonds,
+    'children': children,
+    'configurer_object': configurer_object,
+}
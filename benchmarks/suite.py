@@ -0,0 +1,118 @@
+"""
+Benchmarks of construction, first access, steady-state access and teardown of contexts,
+over synthetic graphs of growing sizes. Uses only the public API, so it runs against older releases too.
+
+    python benchmarks/suite.py --output results.json
+    python benchmarks/suite.py --compare results.json
+"""
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import typing
+
+import pytel
+from graphs import SCENARIOS
+
+try:
+    from pytel.introspection import signature_cache
+except ImportError:
+    signature_cache = None
+
+DEFAULT_SIZES = [10, 100, 1_000, 10_000, 100_000]
+STEADY_ACCESS_ROUNDS = 10
+
+
+def measure(scenario: str, size: int) -> typing.Dict[str, float]:
+    """
+    :return: seconds by metric; steady_access is per single attribute access
+    """
+    build = SCENARIOS[scenario](size)
+    if signature_cache is not None:
+        signature_cache.cache_clear()
+    gc.collect()
+
+    start = time.perf_counter()
+    contexts = build()
+    construction = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for ctx, names in contexts:
+        for name in names:
+            getattr(ctx, name)
+    first_access = time.perf_counter() - start
+
+    accesses = sum(len(names) for _, names in contexts) * STEADY_ACCESS_ROUNDS
+    start = time.perf_counter()
+    for _ in range(STEADY_ACCESS_ROUNDS):
+        for ctx, names in contexts:
+            for name in names:
+                getattr(ctx, name)
+    steady_access = (time.perf_counter() - start) / accesses
+
+    start = time.perf_counter()
+    for ctx, _ in reversed(contexts):
+        ctx.close()
+    teardown = time.perf_counter() - start
+
+    return {
+        'construction': construction,
+        'first_access': first_access,
+        'steady_access': steady_access,
+        'teardown': teardown,
+    }
+
+
+def run(scenarios: typing.Iterable[str], sizes: typing.Iterable[int]) -> dict:
+    results = []
+    for scenario in scenarios:
+        for size in sizes:
+            for metric, seconds in measure(scenario, size).items():
+                results.append({'scenario': scenario, 'size': size, 'metric': metric, 'seconds': seconds})
+                print(f'{scenario:>18} {size:>7} {metric:>14}: {seconds:.3e}s', file=sys.stderr)
+    return {
+        'pytel_version': pytel.__version__,
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+
+def compare(baseline: dict, current: dict) -> None:
+    def key(result):
+        return result['scenario'], result['size'], result['metric']
+
+    before = {key(result): result['seconds'] for result in baseline['results']}
+    print(f'{baseline["pytel_version"]} -> {current["pytel_version"]}')
+    for result in current['results']:
+        if key(result) in before and before[key(result)] > 0:
+            ratio = result['seconds'] / before[key(result)]
+            print(f'{result["scenario"]:>18} {result["size"]:>7} {result["metric"]:>14}: {ratio:6.2f}x')
+
+
+def main(argv: typing.Optional[typing.List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS.keys()),
+                        help='comma separated names, one or more of: ' + ', '.join(SCENARIOS.keys()))
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='comma separated numbers of services')
+    parser.add_argument('--output', help='write results as JSON to this file instead of standard output')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    args = parser.parse_args(argv)
+
+    result = run(args.scenarios.split(','), [int(size) for size in args.sizes.split(',')])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+    elif not args.compare:
+        json.dump(result, sys.stdout, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), result)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,13 @@
-from .context import FactoryType
+from .cache import SharedCache
+from .context import FactoryType, configurer
+from .eviction import EvictionPolicy
+from .lazy import Lazy, LazyProxy
+from .memory import MemoryTracker
+from .profiler import Profiler
 from .pytel import Pytel
+from .reference import Reference
+from .service import service
+from .shutdown import ShutdownError
+from .template import PytelTemplate
 
 __version__ = '0.5.1'
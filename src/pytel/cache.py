@@ -0,0 +1,141 @@
+import collections
+import contextlib
+import threading
+import typing
+
+from .introspection import CacheInfo
+
+
+class _Entry:
+    __slots__ = ('instance', 'ready', 'refs', 'stack', 'lock', 'keep')
+
+    def __init__(self, keep: tuple):
+        self.instance = None
+        self.ready = False
+        self.refs = 0
+        # closes the instance when it's evicted, if it's a context manager
+        self.stack = contextlib.ExitStack()
+        self.lock = threading.Lock()
+        # the factory and dependencies, so that their ids in the key aren't reused while the entry exists
+        self.keep = keep
+
+
+class SharedCache:
+    """
+    Instances of services declared with shared=True, shared by all contexts using the cache.
+
+    Instances are keyed by their factory and the identities of their dependencies, and counted by contexts using them.
+    Once no context uses an instance, it's kept until it's the least recently used one over maxsize,
+    and only then closed if it's a context manager. Instances in use are never evicted.
+    Whoever creates the cache closes it, once the contexts using it are closed.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self._maxsize = maxsize
+        self._entries: 'collections.OrderedDict[typing.Hashable, _Entry]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def acquire(
+            self,
+            factory: typing.Callable,
+            deps: typing.Mapping[str, typing.Any],
+            create: typing.Callable[[contextlib.ExitStack], typing.Any],
+    ) -> typing.Tuple[typing.Any, typing.Callable[[], None]]:
+        """
+        :param create: creates the instance, entering context managers on the given stack
+        :return: the instance and a function to call once the caller no longer uses it
+        """
+        key = (self._factory_key(factory), tuple(sorted((name, id(dep)) for name, dep in deps.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry((factory, tuple(deps.values())))
+            self._entries.move_to_end(key)
+            entry.refs += 1
+
+        with entry.lock:
+            if entry.ready:
+                with self._lock:
+                    self._hits += 1
+            else:
+                try:
+                    entry.instance = create(entry.stack)
+                except BaseException:
+                    self._release(key, entry)
+                    raise
+                entry.ready = True
+                with self._lock:
+                    self._misses += 1
+                    evicted = self._evict()
+                self._close(evicted)
+
+        released = []
+
+        def release():
+            # contexts may release more than once, e.g. when a replaced service is closed and then the context
+            if not released:
+                released.append(True)
+                self._release(key, entry)
+
+        return entry.instance, release
+
+    @staticmethod
+    def _factory_key(factory) -> typing.Hashable:
+        # bound methods are equal when bound to the same configurer, even though each access creates a new one
+        try:
+            hash(factory)
+            return factory
+        except TypeError:
+            return id(factory)
+
+    def _release(self, key, entry: _Entry) -> None:
+        with self._lock:
+            entry.refs -= 1
+            if not entry.ready and entry.refs == 0 and self._entries.get(key) is entry:
+                del self._entries[key]
+            evicted = self._evict()
+        self._close(evicted)
+
+    def _evict(self) -> typing.List[_Entry]:
+        evicted = []
+        excess = len(self._entries) - self._maxsize
+        if excess > 0:
+            for key, entry in list(self._entries.items()):
+                if entry.refs == 0 and entry.ready:
+                    evicted.append(self._entries.pop(key))
+                    excess -= 1
+                    if excess == 0:
+                        break
+        return evicted
+
+    @staticmethod
+    def _close(entries: typing.Iterable[_Entry]) -> None:
+        for entry in entries:
+            entry.stack.close()
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._entries))
+
+    def close(self) -> None:
+        """
+        Close and drop all instances, including ones that contexts still use.
+        """
+        with self._lock:
+            evicted = list(self._entries.values())
+            self._entries.clear()
+        self._close(reversed(evicted))
+
+    def cache_clear(self) -> None:
+        """
+        Close and drop instances that no context uses.
+        """
+        with self._lock:
+            idle = [key for key, entry in self._entries.items() if entry.refs == 0 and entry.ready]
+            evicted = [self._entries.pop(key) for key in idle]
+            self._hits = 0
+            self._misses = 0
+        self._close(evicted)
+
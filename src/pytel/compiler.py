@@ -0,0 +1,77 @@
+import typing
+
+from .lazy import proxy_or_instance
+
+if typing.TYPE_CHECKING:
+    from .pytel import Pytel
+
+
+class CompiledGraph:
+    """
+    Straight-line resolver functions for the services of a validated context.
+
+    The source of all resolvers is generated once, as a single function, and can be bound to the context it was
+    compiled from or to any other context with the same configuration, e.g. scopes created by a PytelTemplate.
+    A compiled resolver calls the factory with its dependencies passed directly as keyword arguments,
+    instead of building a dictionary of them on every call. Factories are looked up through their descriptors,
+    so they can still be released once resolved.
+    """
+
+    def __init__(self, ctx: 'Pytel'):
+        """
+        :raises ValueError: if the context has a profiler, which compiled resolvers would bypass
+        """
+        if ctx._profiler is not None:
+            raise ValueError('Contexts with a profiler can not be compiled')
+        # services that aren't singletons are left to their scopes, shared ones to the cache
+        local = [
+            name for name in ctx._order
+            if ctx._objects[name]._factory is not None and ctx._objects[name]._scope is None
+            and ctx._objects[name]._cache is None
+        ]
+        index = {name: i for i, name in enumerate(ctx._order)}
+        self._order: typing.List[str] = list(ctx._order)
+        self._compiled = local
+        self._external: typing.List[typing.Tuple[str, str]] = []
+
+        lines = ['def make(d, x):']
+        if self._order:
+            lines.append(f'    {", ".join(f"d{i}" for i in range(len(self._order)))}, = d')
+        body = []
+        for name in local:
+            i = index[name]
+            descr = ctx._objects[name]
+            args = []
+            for dep_name, dep in descr._resolved_deps.items():
+                if dep_name in ctx._objects and ctx._objects[dep_name] is dep:
+                    value = f'd{index[dep_name]}'
+                    instance = f'{value}._instance' if dep._scope is None else f'{value}.instance'
+                else:
+                    value = f'x{len(self._external)}'
+                    instance = f'{value}.instance'
+                    self._external.append((name, dep_name))
+                if dep_name in descr._proxied:
+                    instance = f'proxy_or_instance({value})'
+                args.append(f'{dep_name}={instance}')
+            body.append(f'    def r{i}():')
+            body.append(f'        return d{i}._accept(d{i}._factory({", ".join(args)}))')
+        if self._external:
+            lines.append(f'    {", ".join(f"x{i}" for i in range(len(self._external)))}, = x')
+        lines.extend(body)
+        lines.append(f'    return ({"".join(f"r{index[name]}, " for name in local)})')
+
+        self.source = '\n'.join(lines)
+        namespace = {'proxy_or_instance': proxy_or_instance}
+        exec(compile(self.source, f'<pytel compiled graph of {len(local)} services>', 'exec'), namespace)
+        self._make = namespace['make']
+
+    def bind(self, ctx: 'Pytel') -> None:
+        """
+        Make the descriptors of ctx use the compiled resolvers.
+        """
+        objects = ctx._objects
+        descriptors = [objects[name] for name in self._order]
+        external = [objects[name]._resolved_deps[dep_name] for name, dep_name in self._external]
+        for name, resolver in zip(self._compiled, self._make(descriptors, external)):
+            objects[name]._compiled = resolver
+
@@ -1,53 +1,379 @@
+import asyncio
+import concurrent.futures
 import contextlib
 import inspect
 import logging
+import threading
+import types
 import typing
+import weakref
+
+from .graph import run_concurrently, topological_order
+from .introspection import signature_cache
+from .lazy import proxy_or_instance, unwrap_lazy
+from .reference import Reference
+from .scope import ScopeType, new_scope
+from .service import DEFAULT_OPTIONS, EVICTABLE, POOLED, ServiceSpec
+
+if typing.TYPE_CHECKING:
+    from .cache import SharedCache
+    from .eviction import EvictionPolicy
+    from .memory import MemoryTracker
+    from .profiler import Profiler
 
 log = logging.getLogger(__name__)
 
 T = typing.TypeVar('T')
+
+# guards lazy creation of descriptor locks
+_lock_allocation = threading.Lock()
 FactoryType = typing.Union[T, typing.Callable[..., T]]
 
+# state of a descriptor that depends on its factory, taken over when a service is replaced
+_DEFINITION = (
+    '_factory', '_type', '_deps', '_lazy_deps', '_options', '_resolved_deps', '_proxied', '_instance', '_closer',
+    '_compiled', '_scope', '_future', '_cache',
+)
+
+
+class _AsyncBuild(concurrent.futures.Future):
+    """
+    Done once a coroutine running in the given thread created the instance, or failed to.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.thread = threading.get_ident()
+        # waiters can't cancel it
+        self.set_running_or_notify_cancel()
+
 
 class ObjectDescriptor(typing.Generic[T]):
+    __slots__ = (
+        '_factory', '_name', '_type', '_deps', '_resolved_deps', '_instance',
+        '_exit_stack', '_async_exit_stack', '_closer', '_compiled', '_release_references', '_lock',
+        '_profiler', '_options', '_lazy_deps', '_proxied', '_scope', '_future', '_cache',
+        '_memory', '_eviction',
+    )
+
     def __init__(self, factory: typing.Optional[FactoryType],
                  name: str,
                  _type: typing.Type[T],
-                 deps: typing.Dict[str, typing.Type]
+                 deps: typing.Dict[str, typing.Type],
+                 lazy_deps: typing.FrozenSet[str] = frozenset(),
                  ):
+        """
+        :param lazy_deps: names of dependencies annotated as Lazy
+        """
         self._factory = factory
         self._name = name
         self._type = _type
         self._deps = deps
+        self._lazy_deps = lazy_deps
+        self._options = DEFAULT_OPTIONS
         self._resolved_deps = None
+        # names of dependencies injected as LazyProxy
+        self._proxied: typing.FrozenSet[str] = frozenset()
         self._instance: typing.Optional[T] = None
         self._exit_stack: typing.Optional[contextlib.ExitStack] = None
+        self._async_exit_stack: typing.Optional[contextlib.AsyncExitStack] = None
+        # closes the instance, or all instances of a service that isn't a singleton
+        self._closer: typing.Union[contextlib.ExitStack, contextlib.AsyncExitStack, None] = None
+        self._compiled: typing.Optional[typing.Callable[[], T]] = None
+        self._release_references = False
+        self._lock: typing.Optional[threading.Lock] = None
+        self._profiler: typing.Optional['Profiler'] = None
+        # instances of services that aren't singletons, set when bound to a context
+        self._scope: typing.Optional[ScopeType] = None
+        # done once the instance is created in background or by a coroutine
+        self._future: typing.Optional[concurrent.futures.Future] = None
+        # where shared services take instances from, set when bound to a context
+        self._cache: typing.Optional['SharedCache'] = None
+        self._memory: typing.Optional['MemoryTracker'] = None
+        self._eviction: typing.Optional['EvictionPolicy'] = None
 
     def _resolve(self) -> T:
         assert self._instance is None, 'Called factory on resolved object'
 
-        deps = {name: descr.instance for name, descr in self._resolved_deps.items()}
-        instance = self._factory(**deps)
+        if self._memory is not None:
+            with self._memory.factory(self):
+                return self._resolve_instance()
+        return self._resolve_instance()
+
+    def _resolve_instance(self) -> T:
+        if self._cache is not None:
+            return self._resolve_shared()
+        if self._profiler is not None:
+            with self._profiler.factory(self):
+                return self._accept(self._call_factory())
+        if self._compiled is not None:
+            return self._compiled()
+        return self._accept(self._call_factory())
+
+    def _create(self, enter: typing.Optional[typing.Callable[[typing.Any], T]] = None) -> T:
+        """
+        Create a new instance that isn't kept by the descriptor, for services that aren't singletons.
+
+        :param enter: enters context managers, by default on a stack of the context
+        """
+        if self._memory is not None:
+            with self._memory.factory(self):
+                return self._create_instance(enter)
+        return self._create_instance(enter)
+
+    def _create_instance(self, enter: typing.Optional[typing.Callable[[typing.Any], T]] = None) -> T:
+        if self._profiler is not None:
+            with self._profiler.factory(self):
+                return self._prepare(self._call_factory(), enter)
+        return self._prepare(self._call_factory(), enter)
+
+    def _resolve_shared(self) -> T:
+        deps = self._dependency_instances()
+        factory = self._factory
+
+        def create(stack: contextlib.ExitStack):
+            if self._profiler is not None:
+                with self._profiler.factory(self):
+                    return self._prepare(factory(**deps), stack.enter_context)
+            return self._prepare(factory(**deps), stack.enter_context)
+
+        instance, release = self._cache.acquire(factory, deps, create)
+        # closing the service only releases it, the cache closes the instance once it's evicted
+        closer = contextlib.ExitStack()
+        closer.callback(release)
+        self._exit_stack.push(closer)
+        self._closer = closer
+        self._instance = instance
+        if self._release_references:
+            self._release()
+        return instance
+
+    def _accept(self, instance) -> T:
+        """
+        Store the instance returned by the factory, entering it if it's a context manager.
+        """
+        instance = self._prepare(instance)
+        self._instance = instance
+        if self._release_references:
+            self._release()
+        return instance
+
+    def _prepare(self, instance, enter: typing.Optional[typing.Callable[[typing.Any], T]] = None) -> T:
+        """
+        :param enter: enters context managers, by default on a stack of the context
+        """
         if instance is None:
             raise ValueError(self._name, f"Factory for '{self._name}' returned None")
-
         if is_context_manager(instance):
-            instance = self._exit_stack.enter_context(instance)
+            return (enter or self._enter)(instance)
+        elif inspect.isawaitable(instance) or is_async_context_manager(instance):
+            if inspect.iscoroutine(instance):
+                instance.close()
+            raise TypeError(self._name, f"Factory for '{self._name}' is asynchronous, use await Pytel.async_get")
+        return instance
+
+    async def _resolve_async(self) -> T:
+        # claimed under the same lock as synchronous resolution, so threads and coroutines call the factory once
+        while self._instance is None:
+            with self._get_lock():
+                future = self._future
+                owned = future is None and self._instance is None
+                if owned:
+                    future = self._future = _AsyncBuild()
+            if owned:
+                await self._build_async(future)
+            elif future is not None:
+                try:
+                    await asyncio.shield(asyncio.wrap_future(future))
+                except BaseException:
+                    if not future.done() or isinstance(future, _AsyncBuild):
+                        raise
+                    # failed or cancelled in background, create it here instead
+                    self._release_build(future)
+        return self._instance
+
+    async def _build_async(self, future: '_AsyncBuild') -> None:
+        try:
+            if self._cache is not None:
+                self._resolve_shared()
+            elif self._profiler is not None:
+                with self._profiler.factory(self):
+                    await self._resolve_async_instance()
+            else:
+                await self._resolve_async_instance()
+        except asyncio.CancelledError:
+            # waiters try again themselves
+            self._release_build(future)
+            future.set_result(None)
+            raise
+        except BaseException as e:
+            self._release_build(future)
+            future.set_exception(e)
+            raise
+        else:
+            self._release_build(future)
+            future.set_result(None)
+
+    def _release_build(self, future: '_AsyncBuild') -> None:
+        with self._get_lock():
+            if self._future is future:
+                self._future = None
+
+    async def _resolve_async_instance(self) -> T:
+        instance = self._call_factory()
+        if inspect.isawaitable(instance):
+            instance = await instance
+        if instance is None:
+            raise ValueError(self._name, f"Factory for '{self._name}' returned None")
+
+        if is_async_context_manager(instance):
+            instance = await self._enter_async(instance)
+        elif is_context_manager(instance):
+            instance = self._enter(instance)
         self._instance = instance
+        if self._release_references:
+            self._release()
         return instance
 
+    def _enter(self, context_manager):
+        # each service gets its own stack, so it can be closed on its own by the shutdown, and only once
+        closer = contextlib.ExitStack()
+        if self._profiler is not None:
+            instance = self._profiler.enter_context(closer, context_manager, self._name)
+        else:
+            instance = closer.enter_context(context_manager)
+        if self._scope is None:
+            self._exit_stack.push(closer)
+            self._closer = closer
+        else:
+            self._scoped_closer().push(closer)
+        return instance
+
+    def _scoped_closer(self) -> contextlib.ExitStack:
+        """
+        :return: stack closing instances of a service that isn't a singleton, so that the shutdown closes them
+            after their dependents and before their dependencies
+        """
+        closer = self._closer
+        if closer is None:
+            with _lock_allocation:
+                closer = self._closer
+                if closer is None:
+                    closer = self._closer = contextlib.ExitStack()
+                    self._exit_stack.push(closer)
+        return closer
+
+    async def _enter_async(self, context_manager):
+        closer = contextlib.AsyncExitStack()
+        if self._profiler is not None:
+            instance = await self._profiler.enter_async_context(closer, context_manager, self._name)
+        else:
+            instance = await closer.enter_async_context(context_manager)
+        # keep the close order of sync and async resources by moving the sync ones entered so far below this one
+        self._async_exit_stack.enter_context(self._exit_stack.pop_all())
+        self._async_exit_stack.push_async_exit(closer)
+        self._closer = closer
+        return instance
+
+    def _release(self) -> None:
+        """
+        Drop references only needed to create the instance, so that factories and whatever they hold can be collected.
+        Dependencies are kept, as they define the order of shutdown.
+        """
+        self._factory = None
+        self._compiled = None
+        self._exit_stack = None
+        self._async_exit_stack = None
+
+    def _call_factory(self):
+        return self._factory(**self._dependency_instances())
+
+    def _dependency_instances(self) -> typing.Dict[str, typing.Any]:
+        proxied = self._proxied
+        return {
+            name: proxy_or_instance(descr) if name in proxied else descr.instance
+            for name, descr in self._resolved_deps.items()
+        }
+
     def resolve_dependencies(
             self,
             resolver: typing.Callable[[str, typing.Type], 'ObjectDescriptor'],
             exit_stack: contextlib.ExitStack,
+            async_exit_stack: typing.Optional[contextlib.AsyncExitStack] = None,
+            release_references: bool = False,
     ):
+        """
+        :param release_references: drop the factory and dependencies once the instance is created
+        """
         self._resolved_deps = {name: resolver(name, typ) for name, typ in self._deps.items()}
+        for name, descr in self._resolved_deps.items():
+            if descr._options.scope == POOLED:
+                raise ValueError(f'{self._name} depends on {descr.name}, which is pooled. Use Pytel.acquire instead')
+        self._update_proxied()
+        self._scope = new_scope(self)
         self._exit_stack = exit_stack
+        self._async_exit_stack = async_exit_stack
+        self._release_references = release_references
+
+    def _update_proxied(self) -> None:
+        self._proxied = self._lazy_deps.union(
+            name for name, descr in self._resolved_deps.items()
+            if descr._options.lazy or descr._options.scope == EVICTABLE)
+
+    def _redefine(self, other: 'ObjectDescriptor') -> tuple:
+        """
+        Take the factory, type, dependencies and instance of another descriptor, keeping the binding to the context.
+
+        :return: the previous definition, to put back with _restore
+        """
+        with self._get_lock():
+            previous = tuple(getattr(self, slot) for slot in _DEFINITION)
+            for slot in _DEFINITION:
+                setattr(self, slot, getattr(other, slot))
+        return previous
+
+    def _restore(self, definition: tuple) -> None:
+        with self._get_lock():
+            for slot, value in zip(_DEFINITION, definition):
+                setattr(self, slot, value)
+
+    def _reset(self) -> typing.Union[contextlib.ExitStack, contextlib.AsyncExitStack, None]:
+        """
+        Forget the instance, so it's created again on next use.
+
+        :return: the stack closing the old instance, if it was a context manager
+        """
+        with self._get_lock():
+            closer = self._closer
+            self._instance = None
+            self._closer = None
+            self._compiled = None
+            self._future = None
+            if self._scope is not None:
+                self._scope = new_scope(self)
+        return closer
+
+    def copy(self) -> 'ObjectDescriptor':
+        """
+        :return: an unbound descriptor with the same factory and dependencies. Values given as objects keep the instance.
+        """
+        result = ObjectDescriptor(self._factory, self._name, self._type, self._deps, self._lazy_deps)
+        result._options = self._options
+        if self._factory is None:
+            result._instance = self._instance
+        return result
 
     @classmethod
     def from_(cls, name, obj) -> 'ObjectDescriptor':
         if obj is None:
             raise ValueError(None)
+        elif isinstance(obj, ServiceSpec):
+            result = ObjectDescriptor.from_(name, obj.factory)
+            result._options = obj.options
+            return result
+        elif isinstance(obj, Reference):
+            t, deps, lazy_deps = obj.introspect()
+            return ObjectDescriptor(obj, name, t, deps, lazy_deps)
         elif isinstance(obj, type) or callable(obj):
             return ObjectDescriptor.from_callable(name, obj)
         else:
@@ -56,21 +382,8 @@ class ObjectDescriptor(typing.Generic[T]):
     @classmethod
     def from_callable(cls, name, factory: FactoryType) -> 'ObjectDescriptor':
         assert factory is not None
-        signature = inspect.signature(factory)
-        if isinstance(factory, type):
-            t = factory
-        else:
-            if signature.return_annotation is not inspect.Signature.empty:
-                t = signature.return_annotation
-                if t is None:
-                    raise TypeError(name, 'Callable type hint is None', factory)
-            else:
-                raise TypeError(name, 'No return type annotation')
-
-        deps = spec_to_types(signature, name)
-
-        log.debug("Dependencies for %s: %s", factory.__qualname__, deps)
-        return ObjectDescriptor(factory, name, t, deps)
+        t, deps, lazy_deps = signature_cache.get(factory, lambda: introspect(name, factory))
+        return ObjectDescriptor(factory, name, t, dict(deps), lazy_deps)
 
     @classmethod
     def from_object(cls, name, value: object) -> 'ObjectDescriptor':
@@ -100,15 +413,150 @@ class ObjectDescriptor(typing.Generic[T]):
 
     @property
     def instance(self) -> T:
-        return self._instance \
-            if self._instance is not None \
-            else self._resolve()
+        if self._instance is None:
+            if self._scope is not None:
+                return self._scope.get()
+            for descr in self.resolution_order():
+                descr._resolve_once()
+        return self._instance
+
+    def _resolve_once(self) -> None:
+        """
+        Resolve the instance unless another thread did it already. Dependencies must be resolved.
+        Waits for an instance created in background or by a coroutine. If that fails, the coroutine's error is raised,
+        while the one in background is retried here.
+        """
+        while self._instance is None:
+            future = self._future
+            if future is None:
+                self._build_once()
+            elif isinstance(future, _AsyncBuild) and future.thread == threading.get_ident():
+                # waiting would block the event loop running the coroutine
+                raise RuntimeError(
+                    self._name, f"'{self._name}' is being created by a coroutine, use await Pytel.async_get")
+            else:
+                try:
+                    future.result()
+                except BaseException:
+                    if isinstance(future, _AsyncBuild):
+                        raise
+                    self._release_build(future)
+
+    def _build_once(self) -> None:
+        if self._instance is None:
+            with self._get_lock():
+                if self._instance is None and not isinstance(self._future, _AsyncBuild):
+                    self._resolve()
+
+    def _get_lock(self) -> threading.Lock:
+        # locks are only allocated for descriptors that are resolved lazily
+        lock = self._lock
+        if lock is None:
+            with _lock_allocation:
+                lock = self._lock
+                if lock is None:
+                    lock = self._lock = threading.Lock()
+        return lock
+
+    async def async_instance(self) -> T:
+        """
+        Resolve the instance awaiting asynchronous factories and context managers.
+        Independent dependencies are resolved concurrently.
+        """
+        if self._scope is not None:
+            # instances are created synchronously, once the singletons they need are ready
+            order = resolution_order(scoped_dependencies(self))
+            await run_concurrently(order, unresolved_dependencies, ObjectDescriptor._resolve_async, id)
+            return self._scope.get()
+        if self._instance is None:
+            await run_concurrently(self.resolution_order(), unresolved_dependencies, ObjectDescriptor._resolve_async, id)
+        return self._instance
+
+    def resolution_order(self) -> typing.List['ObjectDescriptor']:
+        """
+        Unresolved descriptors this one needs, dependencies first, ending with this descriptor.
+        """
+        return resolution_order([self])
 
     @property
     def name(self):
         return self._name
 
 
+def introspect(
+        name: str,
+        factory: FactoryType,
+) -> typing.Tuple[typing.Type, typing.Dict[str, typing.Type], typing.FrozenSet[str]]:
+    """
+    :return: the type of objects produced by the factory, types of its dependencies by name
+        and names of dependencies annotated as Lazy
+    """
+    signature = inspect.signature(factory)
+    if isinstance(factory, type):
+        t = factory
+    else:
+        if signature.return_annotation is not inspect.Signature.empty:
+            t = signature.return_annotation
+            if t is None:
+                raise TypeError(name, 'Callable type hint is None', factory)
+        else:
+            raise TypeError(name, 'No return type annotation')
+
+    deps = {}
+    lazy_deps = set()
+    for dep_name, annotation in spec_to_types(signature, name).items():
+        deps[dep_name], is_lazy = unwrap_lazy(annotation)
+        if is_lazy:
+            lazy_deps.add(dep_name)
+
+    log.debug("Dependencies for %s: %s", getattr(factory, "__qualname__", factory), deps)
+    return t, deps, frozenset(lazy_deps)
+
+
+def unresolved_dependencies(descr: ObjectDescriptor) -> typing.Iterable[ObjectDescriptor]:
+    """
+    Dependencies to resolve before the descriptor; lazily injected ones are left to their proxies,
+    and ones that aren't singletons are created when the descriptor is.
+    """
+    proxied = descr._proxied
+    return (
+        dep for name, dep in descr._resolved_deps.items()
+        if dep._instance is None and dep._scope is None and name not in proxied
+    )
+
+
+def scoped_dependencies(descr: ObjectDescriptor) -> typing.List[ObjectDescriptor]:
+    """
+    Unresolved singletons needed by every instance of a service that isn't a singleton, including through
+    dependencies that aren't singletons either.
+    """
+    seen = {id(descr)}
+    stack = [descr]
+    result = []
+    while stack:
+        current = stack.pop()
+        for name, dep in current._resolved_deps.items():
+            if name in current._proxied or id(dep) in seen:
+                continue
+            seen.add(id(dep))
+            if dep._scope is not None:
+                stack.append(dep)
+            elif dep._instance is None:
+                result.append(dep)
+    return result
+
+
+def resolution_order(descriptors: typing.Iterable[ObjectDescriptor]) -> typing.List[ObjectDescriptor]:
+    """
+    Unresolved descriptors needed to instantiate the given ones, dependencies first.
+    """
+    return topological_order(
+        (descr for descr in descriptors if descr._instance is None and descr._scope is None),
+        unresolved_dependencies,
+        id,
+    )
+
+
 def spec_to_types(spec: inspect.Signature, parent_name: str) -> typing.Dict[str, typing.Type]:
     return {
         key: _assert_param_not_empty(key, param.annotation, parent_name)
@@ -124,9 +572,30 @@ def _assert_param_not_empty(name, obj, parent_name):
         return obj
 
 
+# (is context manager, is asynchronous context manager) by type of instances
+_protocols: 'weakref.WeakKeyDictionary[type, typing.Tuple[bool, bool]]' = weakref.WeakKeyDictionary()
+
+
+def _protocols_of(t: type) -> typing.Tuple[bool, bool]:
+    try:
+        return _protocols[t]
+    except KeyError:
+        pass
+    # like the with statement, look up the special methods on the type
+    result = (
+        hasattr(t, '__enter__') and hasattr(t, '__exit__'),
+        hasattr(t, '__aenter__') and hasattr(t, '__aexit__'),
+    )
+    _protocols[t] = result
+    return result
+
+
 def is_context_manager(obj: object) -> bool:
-    d = dir(obj)
-    return '__enter__' in d and '__exit__' in d
+    return _protocols_of(type(obj))[0]
+
+
+def is_async_context_manager(obj: object) -> bool:
+    return _protocols_of(type(obj))[1]
 
 
 def _is_under(name: str) -> bool:
@@ -141,7 +610,47 @@ def to_factory_map(configurer) -> typing.Mapping[str, object]:
 
 
 def services_from_object(configurer: object) -> typing.Dict[str, object]:
+    registered = type(configurer).__dict__.get(_REGISTRY)
+    if registered is not None:
+        return {name: getattr(configurer, name) for name in registered}
     return {name: getattr(configurer, name)
             for name in dir(configurer)
             if not _is_under(name)
             }
+
+
+_REGISTRY = '__pytel_services__'
+
+
+def configurer(cls: typing.Type[T]) -> typing.Type[T]:
+    """
+    Class decorator registering services of a configurer once, when the class is defined.
+
+    Public methods, classes, values and service(...) declarations of the class body and of registered base classes
+    are services; properties and other descriptors aren't, and neither are attributes set on instances.
+    Instances are then configured from the registry, without scanning dir() or evaluating other attributes,
+    and signatures of the methods are introspected up front.
+
+    :raises TypeError: if a factory lacks type annotations
+    """
+    names = {}
+    for base in reversed(cls.__mro__[1:]):
+        names.update(dict.fromkeys(base.__dict__.get(_REGISTRY, ())))
+    for name, value in vars(cls).items():
+        if _is_under(name):
+            continue
+        factory = value.factory if isinstance(value, ServiceSpec) else value
+        if isinstance(factory, (types.FunctionType, classmethod)):
+            signature = introspect(name, factory.__get__(None, cls))
+            signature_cache.put(getattr(factory, '__func__', factory), signature, is_method=True)
+        elif isinstance(factory, staticmethod):
+            signature_cache.put(factory.__func__, introspect(name, factory.__func__), is_method=False)
+        elif isinstance(factory, Reference) or isinstance(factory, type) or not hasattr(factory, '__get__'):
+            pass
+        else:
+            # properties and other descriptors could compute anything on access
+            names.pop(name, None)
+            continue
+        names[name] = None
+    setattr(cls, _REGISTRY, tuple(names))
+    return cls
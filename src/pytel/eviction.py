@@ -0,0 +1,162 @@
+import collections
+import contextlib
+import threading
+import time
+import typing
+
+EvictionInfo = collections.namedtuple('EvictionInfo', ['instances', 'size', 'evictions'])
+EvictionInfo.__doc__ = """
+Instances of evictable services held by an EvictionPolicy, their total size in bytes, and how many were evicted.
+"""
+
+
+class _Entry:
+    __slots__ = ('instance', 'stack', 'size', 'used', 'pins')
+
+    def __init__(self, instance, stack: contextlib.ExitStack, size: int):
+        self.instance = instance
+        # closes the instance when it's evicted, if it's a context manager
+        self.stack = stack
+        self.size = size
+        self.used = time.monotonic()
+        self.pins = 0
+
+
+class EvictionPolicy:
+    """
+    Budget of instances of services declared with scope='evictable', shared by all contexts using the policy.
+
+    Once the budget is exceeded, instances are evicted in least recently used order, closing them if they're
+    context managers, and created again on next use. Instances borrowed with Pytel.acquire are never evicted.
+    Dependents of evictable services receive a LazyProxy that looks up the current instance on every use.
+    """
+
+    def __init__(
+            self,
+            max_instances: typing.Optional[int] = None,
+            max_bytes: typing.Optional[int] = None,
+            max_idle: typing.Optional[float] = None,
+            sizeof: typing.Optional[typing.Callable[[typing.Any], int]] = None,
+    ):
+        """
+        :param max_instances: number of instances to keep, None for no limit
+        :param max_bytes: total size of instances to keep, None for no limit
+        :param max_idle: seconds after last use when an instance is evicted by collect
+        :param sizeof: size of an instance in bytes, required with max_bytes
+        :raises ValueError: if max_bytes is given without sizeof
+        """
+        if max_bytes is not None and sizeof is None:
+            raise ValueError('max_bytes needs sizeof to measure instances')
+        self._max_instances = max_instances
+        self._max_bytes = max_bytes
+        self._max_idle = max_idle
+        self._sizeof = sizeof
+        self._entries: 'collections.OrderedDict[typing.Hashable, _Entry]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self._evictions = 0
+
+    def create(self, key: typing.Hashable, create: typing.Callable[[contextlib.ExitStack], typing.Any], pin: bool):
+        """
+        :param create: creates the instance, entering context managers on the given stack
+        :param pin: keep the instance until unpin is called
+        """
+        stack = contextlib.ExitStack()
+        try:
+            instance = create(stack)
+            size = 0 if self._sizeof is None else self._sizeof(instance)
+        except BaseException:
+            stack.close()
+            raise
+
+        entry = _Entry(instance, stack, size)
+        entry.pins = int(pin)
+        with self._lock:
+            self._entries[key] = entry
+            self._size += size
+        # the new instance is returned to the caller, so it stays even if it alone is over the budget
+        self._collect(key)
+        return instance
+
+    def get(self, key: typing.Hashable, pin: bool = False):
+        """
+        :return: the instance kept for the key, marking it as used, or None if there's none
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            entry.used = time.monotonic()
+            if pin:
+                entry.pins += 1
+            return entry.instance
+
+    def unpin(self, key: typing.Hashable) -> None:
+        """
+        Allow evicting the instance of the key again, counting it as used until now.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.pins -= 1
+                entry.used = time.monotonic()
+                self._entries.move_to_end(key)
+        self.collect()
+
+    def discard(self, key: typing.Hashable) -> None:
+        """
+        Close and forget the instance of the key, even if it's pinned.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._size -= entry.size
+        if entry is not None:
+            entry.stack.close()
+
+    def collect(self) -> None:
+        """
+        Evict instances over the budget, and ones not used for max_idle seconds.
+        Evictions happen on their own whenever an instance is created or released;
+        call it periodically for max_idle to take effect in between.
+        """
+        self._collect(None)
+
+    def _collect(self, keep: typing.Optional[typing.Hashable]) -> None:
+        with self._lock:
+            evicted = []
+            idle_since = None if self._max_idle is None else time.monotonic() - self._max_idle
+            for key, entry in list(self._entries.items()):
+                if entry.pins or key is keep:
+                    continue
+                over = (self._max_instances is not None and len(self._entries) > self._max_instances) or \
+                    (self._max_bytes is not None and self._size > self._max_bytes)
+                if not over and (idle_since is None or entry.used > idle_since):
+                    # entries are in order of use, so the rest are used more recently
+                    break
+                evicted.append(self._pop(key))
+        self._close(evicted)
+
+    def evict_idle(self) -> None:
+        """
+        Evict all instances that aren't borrowed.
+        """
+        with self._lock:
+            evicted = [self._pop(key) for key, entry in list(self._entries.items()) if not entry.pins]
+        self._close(evicted)
+
+    def _pop(self, key: typing.Hashable) -> _Entry:
+        entry = self._entries.pop(key)
+        self._size -= entry.size
+        self._evictions += 1
+        return entry
+
+    @staticmethod
+    def _close(entries: typing.Iterable[_Entry]) -> None:
+        for entry in entries:
+            entry.stack.close()
+
+    def info(self) -> EvictionInfo:
+        with self._lock:
+            return EvictionInfo(len(self._entries), self._size, self._evictions)
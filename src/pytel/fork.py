@@ -0,0 +1,55 @@
+import collections
+import itertools
+import os
+import threading
+import typing
+import weakref
+
+if typing.TYPE_CHECKING:
+    from .pytel import Pytel
+
+# contexts with fork policies, or children of such, in order of creation so that parents come first
+_contexts: typing.Dict[int, weakref.ref] = collections.OrderedDict()
+_counter = itertools.count()
+_lock = threading.Lock()
+
+
+def track(ctx: 'Pytel') -> None:
+    """
+    Apply fork policies of services of the context in child processes, as long as the context exists.
+    """
+    key = next(_counter)
+    with _lock:
+        _contexts[key] = weakref.ref(ctx, lambda _: _untrack(key))
+
+
+def _untrack(key: int) -> None:
+    with _lock:
+        _contexts.pop(key, None)
+
+
+def _before_fork() -> None:
+    _lock.acquire()
+
+
+def _after_fork_in_parent() -> None:
+    _lock.release()
+
+
+def _after_fork_in_child() -> None:
+    global _lock
+    _lock = threading.Lock()
+    # ids of descriptors reset so far, so that children of contexts reset dependents of their ancestors' services
+    reset: typing.Set[int] = set()
+    for ref in list(_contexts.values()):
+        ctx = ref()
+        if ctx is not None:
+            ctx._after_fork(reset)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(
+        before=_before_fork,
+        after_in_parent=_after_fork_in_parent,
+        after_in_child=_after_fork_in_child,
+    )
@@ -0,0 +1,195 @@
+import asyncio
+import collections
+import concurrent.futures
+import threading
+import typing
+
+N = typing.TypeVar('N')
+
+
+def topological_order(
+        roots: typing.Iterable[N],
+        edges: typing.Callable[[N], typing.Iterable[N]],
+        key: typing.Callable[[N], typing.Hashable] = lambda node: node,
+) -> typing.List[N]:
+    """
+    Iterative depth-first post-order of the graph reachable from roots, dependencies first.
+    Runs in O(V+E) and does not recurse, so it works on arbitrarily deep chains.
+
+    :param roots: nodes to start from
+    :param edges: returns the direct dependencies of a node
+    :param key: returns a hashable identity of a node
+    :raises ValueError: when the graph contains a cycle
+    """
+    order = []
+    done = set()
+    for root in roots:
+        if key(root) in done:
+            continue
+
+        path = [root]
+        on_path = {key(root)}
+        pending = [iter(edges(root))]
+        while pending:
+            for dep in pending[-1]:
+                dep_key = key(dep)
+                if dep_key in done:
+                    continue
+                if dep_key in on_path:
+                    raise ValueError(f'{_name(dep)} depends on itself. Dependency path: {[_name(n) for n in path + [dep]]}')
+                path.append(dep)
+                on_path.add(dep_key)
+                pending.append(iter(edges(dep)))
+                break
+            else:
+                pending.pop()
+                node = path.pop()
+                node_key = key(node)
+                on_path.discard(node_key)
+                done.add(node_key)
+                order.append(node)
+    return order
+
+
+def _name(node) -> str:
+    return getattr(node, 'name', node)
+
+
+def run_in_parallel(
+        order: typing.Sequence[N],
+        edges: typing.Callable[[N], typing.Iterable[N]],
+        action: typing.Callable[[N], typing.Any],
+        executor: concurrent.futures.Executor,
+        key: typing.Callable[[N], typing.Hashable] = lambda node: node,
+) -> None:
+    """
+    Call action on every node, each one only after the action finished for all of its dependencies within order.
+    Independent nodes run concurrently on the executor.
+
+    :param order: nodes in topological order, dependencies first
+    :param edges: returns the direct dependencies of a node; ones not in order are ignored
+    :raises: the first exception raised by action, after all started actions have finished
+    """
+    nodes = {key(node): node for node in order}
+    waiting_for: typing.Dict[typing.Hashable, int] = {}
+    dependents: typing.Dict[typing.Hashable, typing.List[typing.Hashable]] = collections.defaultdict(list)
+    for node_key, node in nodes.items():
+        dep_keys = {key(dep) for dep in edges(node)}.intersection(nodes.keys())
+        waiting_for[node_key] = len(dep_keys)
+        for dep_key in dep_keys:
+            dependents[dep_key].append(node_key)
+
+    running = {
+        executor.submit(action, nodes[node_key]): node_key
+        for node_key, count in waiting_for.items() if count == 0
+    }
+    error: typing.Optional[BaseException] = None
+    while running:
+        finished, _ = concurrent.futures.wait(running.keys(), return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in finished:
+            node_key = running.pop(future)
+            if future.exception() is not None:
+                error = error or future.exception()
+            if error is not None:
+                continue
+            for dependent_key in dependents[node_key]:
+                waiting_for[dependent_key] -= 1
+                if waiting_for[dependent_key] == 0:
+                    running[executor.submit(action, nodes[dependent_key])] = dependent_key
+    if error is not None:
+        raise error
+
+
+def run_in_background(
+        order: typing.Sequence[N],
+        edges: typing.Callable[[N], typing.Iterable[N]],
+        action: typing.Callable[[N], typing.Any],
+        executor: concurrent.futures.Executor,
+        key: typing.Callable[[N], typing.Hashable] = lambda node: node,
+) -> typing.Dict[typing.Hashable, concurrent.futures.Future]:
+    """
+    Like run_in_parallel, but return without waiting for the actions.
+
+    :return: futures by key of every node in order, done when the action finished for the node.
+        If the action fails for a node, its dependents fail with the same exception and their actions aren't called.
+    """
+    nodes = {key(node): node for node in order}
+    futures = {node_key: concurrent.futures.Future() for node_key in nodes.keys()}
+    waiting_for: typing.Dict[typing.Hashable, int] = {}
+    dependents: typing.Dict[typing.Hashable, typing.List[typing.Hashable]] = collections.defaultdict(list)
+    for node_key, node in nodes.items():
+        dep_keys = {key(dep) for dep in edges(node)}.intersection(nodes.keys())
+        waiting_for[node_key] = len(dep_keys)
+        for dep_key in dep_keys:
+            dependents[dep_key].append(node_key)
+    lock = threading.Lock()
+
+    def run(node_key):
+        future = futures[node_key]
+        if not future.set_running_or_notify_cancel():
+            fail(node_key, concurrent.futures.CancelledError())
+            return
+        try:
+            action(nodes[node_key])
+        except BaseException as e:
+            future.set_exception(e)
+            fail(node_key, e)
+            return
+        future.set_result(None)
+        with lock:
+            ready = []
+            for dependent_key in dependents[node_key]:
+                waiting_for[dependent_key] -= 1
+                if waiting_for[dependent_key] == 0:
+                    ready.append(dependent_key)
+        for dependent_key in ready:
+            executor.submit(run, dependent_key)
+
+    def fail(node_key, error):
+        with lock:
+            pending = list(dependents[node_key])
+            while pending:
+                dependent_key = pending.pop()
+                future = futures[dependent_key]
+                if not future.done() and future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+                    pending.extend(dependents[dependent_key])
+
+    for node_key, count in waiting_for.items():
+        if count == 0:
+            executor.submit(run, node_key)
+    return futures
+
+
+async def run_concurrently(
+        order: typing.Sequence[N],
+        edges: typing.Callable[[N], typing.Iterable[N]],
+        action: typing.Callable[[N], typing.Awaitable],
+        key: typing.Callable[[N], typing.Hashable] = lambda node: node,
+) -> None:
+    """
+    Await action on every node, each one only after the action finished for all of its dependencies within order.
+    Independent nodes run concurrently as asyncio tasks.
+
+    :param order: nodes in topological order, dependencies first
+    :param edges: returns the direct dependencies of a node; ones not in order are ignored
+    :raises: the first exception raised by action, after cancelling the remaining tasks
+    """
+
+    async def run(node, deps):
+        if deps:
+            await asyncio.gather(*deps)
+        await action(node)
+
+    tasks: typing.Dict[typing.Hashable, asyncio.Future] = {}
+    for node in order:
+        deps = [tasks[key(dep)] for dep in edges(node) if key(dep) in tasks]
+        tasks[key(node)] = asyncio.ensure_future(run(node, deps))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
@@ -0,0 +1,107 @@
+import collections
+import inspect
+import threading
+import typing
+import weakref
+
+CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+V = typing.TypeVar('V')
+
+
+class IntrospectionCache(typing.Generic[V]):
+    """
+    Bounded LRU cache of values computed from factories, holding only weak references to them.
+    Bound methods are keyed by their underlying function, so the result is shared by all instances of a configurer.
+    Factories that can't be weakly referenced or hashed are never cached.
+    Entries of collected factories are dropped on the next locked operation, as the garbage collector may run
+    while the lock is held by the same thread.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._maxsize = maxsize
+        self._data: 'collections.OrderedDict[typing.Tuple[bool, weakref.ref], V]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # references to collected factories, appended without the lock
+        self._pending_removals: typing.List[weakref.ref] = []
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, factory: typing.Callable, compute: typing.Callable[[], V]) -> V:
+        key = self._key(factory)
+        if key is not None:
+            with self._lock:
+                self._purge()
+                if key in self._data:
+                    self._hits += 1
+                    self._data.move_to_end(key)
+                    return self._data[key]
+                self._misses += 1
+
+        value = compute()
+
+        if key is not None:
+            self._store(key, value)
+        return value
+
+    def put(self, factory: typing.Callable, value: V, is_method: typing.Optional[bool] = None) -> None:
+        """
+        Store a value computed ahead of time.
+
+        :param is_method: store the value for methods bound to the factory instead of the factory itself
+        """
+        key = self._key(factory, is_method)
+        if key is not None:
+            self._store(key, value)
+
+    def _store(self, key: typing.Tuple[bool, weakref.ref], value: V) -> None:
+        with self._lock:
+            self._purge()
+            self._data[key] = value
+            while len(self._data) > self._maxsize:
+                self._data.popitem(last=False)
+
+    def _key(
+            self,
+            factory,
+            is_method: typing.Optional[bool] = None,
+    ) -> typing.Optional[typing.Tuple[bool, weakref.ref]]:
+        # a bound method has a different signature than its function, so they're cached separately
+        if is_method is None:
+            is_method = inspect.ismethod(factory)
+        if inspect.ismethod(factory):
+            factory = factory.__func__
+        try:
+            key = (is_method, weakref.ref(factory, self._remove))
+            hash(key)
+            return key
+        except TypeError:
+            return None
+
+    def _remove(self, ref: weakref.ref) -> None:
+        self._pending_removals.append(ref)
+
+    def _purge(self) -> None:
+        # called with the lock held
+        pending = self._pending_removals
+        while pending:
+            ref = pending.pop()
+            self._data.pop((True, ref), None)
+            self._data.pop((False, ref), None)
+
+    def cache_info(self) -> CacheInfo:
+        with self._lock:
+            self._purge()
+            return CacheInfo(self._hits, self._misses, self._maxsize, len(self._data))
+
+    def cache_clear(self) -> None:
+        with self._lock:
+            self._pending_removals.clear()
+            self._data.clear()
+            self._hits = 0
+            self._misses = 0
+
+
+signature_cache: IntrospectionCache[
+    typing.Tuple[typing.Type, typing.Dict[str, typing.Type], typing.FrozenSet[str]]
+] = IntrospectionCache()
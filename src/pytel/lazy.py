@@ -0,0 +1,112 @@
+import typing
+
+from .service import EVICTABLE
+
+T = typing.TypeVar('T')
+
+
+class Lazy(typing.Generic[T]):
+    """
+    Annotation of a dependency to inject as a LazyProxy, so it's only built when used::
+
+        def factory(model: Lazy[Model]) -> Service:
+    """
+
+
+def unwrap_lazy(annotation) -> typing.Tuple[typing.Any, bool]:
+    """
+    :return: the annotated type and whether it's marked as Lazy
+    """
+    if getattr(annotation, '__origin__', None) is Lazy:
+        return annotation.__args__[0], True
+    else:
+        return annotation, False
+
+
+class LazyProxy:
+    """
+    Stands in for an object of a service, building it on the first use and forwarding all operations to it.
+    """
+    __slots__ = ('_pytel_descriptor', '_pytel_target', '_pytel_keep')
+
+    def __init__(self, descriptor, keep: bool = True):
+        """
+        :param keep: hold on to the object once built, otherwise ask the descriptor for it on every use
+        """
+        object.__setattr__(self, '_pytel_descriptor', descriptor)
+        object.__setattr__(self, '_pytel_target', None)
+        object.__setattr__(self, '_pytel_keep', keep)
+
+    def _pytel_get(self):
+        target = object.__getattribute__(self, '_pytel_target')
+        if target is None:
+            target = object.__getattribute__(self, '_pytel_descriptor').instance
+            if object.__getattribute__(self, '_pytel_keep'):
+                object.__setattr__(self, '_pytel_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(LazyProxy._pytel_get(self), name)
+
+    def __setattr__(self, name, value):
+        setattr(LazyProxy._pytel_get(self), name, value)
+
+    def __delattr__(self, name):
+        delattr(LazyProxy._pytel_get(self), name)
+
+    @property
+    def __class__(self):
+        return LazyProxy._pytel_get(self).__class__
+
+    def __dir__(self):
+        return dir(LazyProxy._pytel_get(self))
+
+    def __repr__(self):
+        return repr(LazyProxy._pytel_get(self))
+
+    def __str__(self):
+        return str(LazyProxy._pytel_get(self))
+
+    def __bool__(self):
+        return bool(LazyProxy._pytel_get(self))
+
+    def __eq__(self, other):
+        return LazyProxy._pytel_get(self) == other
+
+    def __ne__(self, other):
+        return LazyProxy._pytel_get(self) != other
+
+    def __hash__(self):
+        return hash(LazyProxy._pytel_get(self))
+
+    def __call__(self, *args, **kwargs):
+        return LazyProxy._pytel_get(self)(*args, **kwargs)
+
+    def __len__(self):
+        return len(LazyProxy._pytel_get(self))
+
+    def __iter__(self):
+        return iter(LazyProxy._pytel_get(self))
+
+    def __contains__(self, item):
+        return item in LazyProxy._pytel_get(self)
+
+    def __getitem__(self, key):
+        return LazyProxy._pytel_get(self)[key]
+
+    def __setitem__(self, key, value):
+        LazyProxy._pytel_get(self)[key] = value
+
+    def __delitem__(self, key):
+        del LazyProxy._pytel_get(self)[key]
+
+
+def proxy_or_instance(descriptor):
+    """
+    :return: the instance if the descriptor is resolved, otherwise a LazyProxy
+    """
+    instance = descriptor._instance
+    if instance is not None:
+        return instance
+    # instances of evictable services may be replaced by new ones
+    return LazyProxy(descriptor, descriptor._options.scope != EVICTABLE)
@@ -0,0 +1,198 @@
+import hashlib
+import importlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import typing
+
+from .context import ObjectDescriptor
+from .reference import resolve_path
+from .service import DEFAULT_OPTIONS, ServiceSpec
+
+if typing.TYPE_CHECKING:
+    from .pytel import Pytel
+
+log = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+
+PathType = typing.Union[str, os.PathLike]
+
+
+def type_path(obj) -> str:
+    """
+    :return: 'module:qualname' reference to a type or function
+    :raises ValueError: if the object can't be imported by name
+    """
+    module = getattr(obj, '__module__', None)
+    qualname = getattr(obj, '__qualname__', None)
+    if not module or not qualname or '<locals>' in qualname or '<lambda>' in qualname:
+        raise ValueError(f'{obj!r} can not be referenced by name')
+    return f'{module}:{qualname}'
+
+
+def factory_id(obj) -> str:
+    """
+    :return: 'module:qualname' of a factory, of its function if it's a method, or of its type if it has no name,
+        like values given as objects.
+        Unlike type_path, local functions and lambdas are named too, as it only tells factories apart.
+    """
+    obj = getattr(obj, '__func__', obj)
+    if getattr(obj, '__qualname__', None) is None:
+        obj = type(obj)
+    return f'{getattr(obj, "__module__", None)}:{obj.__qualname__}'
+
+
+def _keys(configurer) -> typing.Optional[typing.List[str]]:
+    # objects are covered by the fingerprint of the module of their type, mappings are built at runtime
+    return sorted(configurer.keys()) if isinstance(configurer, typing.Mapping) else None
+
+
+def _module_of(obj) -> typing.Optional[str]:
+    if isinstance(obj, ServiceSpec):
+        obj = obj.factory
+    obj = getattr(obj, '__func__', obj)
+    if not isinstance(obj, type) and not callable(obj):
+        obj = type(obj)
+    return getattr(obj, '__module__', None)
+
+
+def fingerprint(modules: typing.Iterable[str]) -> str:
+    """
+    :return: hash of paths, modification times and sizes of source files of the modules
+    """
+    digest = hashlib.sha256(str(FORMAT_VERSION).encode())
+    for name in sorted(set(modules)):
+        module = sys.modules.get(name) or importlib.import_module(name)
+        path = getattr(module, '__file__', None)
+        digest.update(name.encode())
+        if path:
+            stat = os.stat(path)
+            digest.update(f'{path}:{stat.st_mtime_ns}:{stat.st_size}'.encode())
+    return digest.hexdigest()
+
+
+def _external_types(ctx: 'Pytel') -> typing.Dict[str, str]:
+    if ctx._by_type:
+        # providers are found again when binding the loaded descriptors
+        return {}
+    return {
+        dep_name: type_path(ctx._parent._find(dep_name).object_type)
+        for descr in ctx._objects.values()
+        for dep_name in descr.dependencies.keys()
+        if dep_name not in ctx._objects
+    }
+
+
+def save_manifest(
+        path: PathType,
+        ctx: 'Pytel',
+        configurers: typing.Sequence[object],
+        sources: typing.Sequence[typing.Iterable[str]],
+) -> None:
+    """
+    Write the validated graph of the context, so that next time it can be built without introspection and checks.
+
+    :param sources: names of services by index of their configurer
+    :raises ValueError: if any of the types or factories can't be referenced by name
+    """
+    services = []
+    modules = {type(configurer).__module__ for configurer in configurers if not isinstance(configurer, typing.Mapping)}
+    for index, names in enumerate(sources):
+        for name in names:
+            descr = ctx._objects[name]
+            factory = descr._factory
+            entry = {
+                'name': name,
+                'configurer': index,
+                'factory': factory is not None,
+                'factory_id': factory_id(descr._instance if factory is None else factory),
+            }
+            if factory is not None:
+                entry['type'] = type_path(descr.object_type)
+                entry['dependencies'] = {dep_name: type_path(t) for dep_name, t in descr.dependencies.items()}
+                entry['lazy'] = sorted(descr._lazy_deps)
+                modules.add(_module_of(factory))
+                modules.update(_module_of(t) for t in [descr.object_type, *descr.dependencies.values()])
+            else:
+                modules.add(_module_of(descr._instance))
+            services.append(entry)
+
+    modules.discard(None)
+    manifest = {
+        'format': FORMAT_VERSION,
+        'modules': sorted(modules),
+        'fingerprint': fingerprint(modules),
+        'configurers': len(configurers),
+        'keys': [_keys(configurer) for configurer in configurers],
+        'external': _external_types(ctx),
+        'services': services,
+        'order': ctx._order,
+    }
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_manifest(
+        path: PathType,
+        configurers: typing.Sequence[object],
+        parent: typing.Optional['Pytel'],
+) -> typing.Optional[typing.Tuple[typing.Dict[str, ObjectDescriptor], typing.List[str]]]:
+    """
+    Build descriptors from a manifest, taking only the listed names from the configurers.
+
+    :return: descriptors by name and their dependency order,
+        or None if there's no manifest or it's out of date
+    """
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+        if manifest.get('format') != FORMAT_VERSION or manifest['configurers'] != len(configurers):
+            return None
+        if manifest['keys'] != [_keys(configurer) for configurer in configurers]:
+            log.debug('Services of configurers changed since manifest %s', path)
+            return None
+        if fingerprint(manifest['modules']) != manifest['fingerprint']:
+            log.debug('Manifest %s is out of date', path)
+            return None
+        for dep_name, path_ in manifest['external'].items():
+            if parent is None or type_path(parent._find(dep_name).object_type) != path_:
+                return None
+
+        objects = {}
+        for entry in manifest['services']:
+            name = entry['name']
+            configurer = configurers[entry['configurer']]
+            obj = configurer[name] if isinstance(configurer, typing.Mapping) else getattr(configurer, name)
+            options = DEFAULT_OPTIONS
+            if isinstance(obj, ServiceSpec):
+                obj, options = obj.factory, obj.options
+            if entry['factory_id'] != factory_id(obj):
+                log.debug('Factory of %s changed since manifest %s', name, path)
+                return None
+            if entry['factory']:
+                descr = ObjectDescriptor(
+                    obj,
+                    name,
+                    resolve_path(entry['type']),
+                    {dep_name: resolve_path(t) for dep_name, t in entry['dependencies'].items()},
+                    frozenset(entry['lazy']),
+                )
+            else:
+                descr = ObjectDescriptor.from_object(name, obj)
+            descr._options = options
+            objects[name] = descr
+        return objects, manifest['order']
+    except (OSError, ValueError, KeyError, AttributeError, ImportError, TypeError) as e:
+        log.debug('Could not use manifest %s: %r', path, e)
+        return None
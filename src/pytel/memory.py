@@ -0,0 +1,117 @@
+import collections
+import contextlib
+import threading
+import tracemalloc
+import typing
+
+from .graph import topological_order
+
+MemoryUsage = collections.namedtuple('MemoryUsage', ['size', 'calls'])
+MemoryUsage.__doc__ = """
+Memory still allocated after factory calls: size in bytes, and how many times the factories were called.
+"""
+
+
+class MemoryTracker:
+    """
+    Records how much memory the factories of services allocate, from the traced memory before and after each call.
+    Pass it to Pytel to enable tracking; it starts tracemalloc unless it's already tracing, until it's closed.
+
+    Each service is charged only for its own factory: memory allocated by factories of its dependencies,
+    even if they're created during the call, like lazy or transient ones, is charged to them.
+    Allocations of other threads are charged to the factory running at the time,
+    so resolve services from a single thread, e.g. with warm_up(max_workers=1), for exact numbers.
+    """
+
+    def __init__(self):
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # descriptor id => (name, size, calls, ids of dependencies)
+        self._usage: typing.Dict[int, typing.Tuple[str, int, int, typing.List[int]]] = {}
+
+    def close(self) -> None:
+        """
+        Stop tracemalloc if this tracker started it. Usage recorded so far is kept.
+        """
+        if self._started:
+            self._started = False
+            tracemalloc.stop()
+
+    @contextlib.contextmanager
+    def factory(self, descr):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        # size charged to factories called meanwhile
+        nested = [0]
+        stack.append(nested)
+        before, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            size = tracemalloc.get_traced_memory()[0] - before
+            stack.pop()
+            if stack:
+                stack[-1][0] += size
+            with self._lock:
+                _, previous_size, calls, _ = self._usage.get(id(descr), (None, 0, 0, None))
+                self._usage[id(descr)] = (
+                    descr.name,
+                    previous_size + size - nested[0],
+                    calls + 1,
+                    [id(dep) for dep in descr._resolved_deps.values()],
+                )
+
+    def usage(self, descriptors: typing.Optional[typing.Iterable] = None) -> typing.Dict[str, MemoryUsage]:
+        """
+        :param descriptors: services to report, all recorded ones by default
+        :return: memory allocated by the factory of each service, by name
+        """
+        with self._lock:
+            usage = dict(self._usage)
+        keys = usage.keys() if descriptors is None else [id(descr) for descr in descriptors if id(descr) in usage]
+        return {usage[key][0]: MemoryUsage(usage[key][1], usage[key][2]) for key in keys}
+
+    def inclusive_usage(self, descriptors: typing.Optional[typing.Iterable] = None) -> typing.Dict[str, MemoryUsage]:
+        """
+        :return: memory allocated by the factory of each service and the ones of all of its dependencies,
+            with the calls of its own factory, by name
+        """
+        with self._lock:
+            usage = dict(self._usage)
+        keys = usage.keys() if descriptors is None else [id(descr) for descr in descriptors if id(descr) in usage]
+
+        result = {}
+        closure: typing.Dict[int, typing.Set[int]] = {}
+        for key in topological_order(keys, lambda k: [dep for dep in usage[k][3] if dep in usage]):
+            closure[key] = {key}.union(*(closure[dep] for dep in usage[key][3] if dep in closure))
+        for key in keys:
+            result[usage[key][0]] = MemoryUsage(sum(usage[k][1] for k in closure[key]), usage[key][2])
+        return result
+
+    def report(self, top: int = 10, descriptors: typing.Optional[typing.Iterable] = None) -> str:
+        """
+        :return: the services whose factories allocated the most memory, as text
+        """
+        if descriptors is not None:
+            descriptors = list(descriptors)
+        usage = self.usage(descriptors)
+        inclusive = self.inclusive_usage(descriptors)
+        heaviest = sorted(usage.items(), key=lambda item: item[1].size, reverse=True)[:top]
+        lines = [f'Heaviest services (top {top}):', f'  {"own":>12}  {"calls":>8}  {"with deps":>12}  name']
+        lines.extend(
+            f'  {_format_size(own.size):>12}  {own.calls:>8}  {_format_size(inclusive[name].size):>12}  {name}'
+            for name, own in heaviest
+        )
+        return '\n'.join(lines)
+
+
+def _format_size(size: int) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if abs(size) < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
@@ -0,0 +1,166 @@
+import collections
+import contextlib
+import json
+import os
+import threading
+import time
+import typing
+
+from .graph import topological_order
+
+Event = collections.namedtuple('Event', ['name', 'category', 'start', 'duration', 'thread'])
+
+
+class Profiler:
+    """
+    Records how long the steps of building and closing a context take.
+    Pass it to Pytel to enable profiling; without it, contexts aren't instrumented.
+
+    Categories of events:
+
+    - introspection: reading the signature of a factory
+    - validation: checking types and cycles of a context
+    - factory: calling a factory, including entering the returned context manager
+    - enter, exit: entering and exiting a context manager
+    """
+
+    def __init__(self, clock: typing.Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._events: typing.List[Event] = []
+        # descriptor id => (name, factory duration, ids of dependencies)
+        self._factories: typing.Dict[int, typing.Tuple[str, float, typing.List[int]]] = {}
+
+    def record(self, name: str, category: str, start: float, duration: float) -> None:
+        with self._lock:
+            self._events.append(Event(name, category, start, duration, threading.get_ident()))
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, category, start, self._clock() - start)
+
+    @contextlib.contextmanager
+    def factory(self, descr):
+        start = self._clock()
+        try:
+            yield
+        finally:
+            duration = self._clock() - start
+            self.record(descr.name, 'factory', start, duration)
+            with self._lock:
+                self._factories[id(descr)] = descr.name, duration, [id(dep) for dep in descr._resolved_deps.values()]
+
+    def enter_context(self, stack: contextlib.ExitStack, context_manager, name: str):
+        """
+        Enter the context manager on the stack, timing both entering and exiting it.
+        """
+        exit_start = []
+        stack.callback(lambda: self.record(name, 'exit', exit_start[0], self._clock() - exit_start[0]))
+        with self.span(name, 'enter'):
+            result = stack.enter_context(context_manager)
+        stack.callback(lambda: exit_start.append(self._clock()))
+        return result
+
+    async def enter_async_context(self, stack: contextlib.AsyncExitStack, context_manager, name: str):
+        exit_start = []
+        stack.callback(lambda: self.record(name, 'exit', exit_start[0], self._clock() - exit_start[0]))
+        with self.span(name, 'enter'):
+            result = await stack.enter_async_context(context_manager)
+        stack.callback(lambda: exit_start.append(self._clock()))
+        return result
+
+    @property
+    def events(self) -> typing.List[Event]:
+        with self._lock:
+            return list(self._events)
+
+    def totals(self) -> typing.Dict[typing.Tuple[str, str], float]:
+        """
+        :return: total duration by name and category
+        """
+        result = collections.defaultdict(float)
+        for event in self.events:
+            result[event.name, event.category] += event.duration
+        return dict(result)
+
+    def inclusive_times(self) -> typing.Dict[str, float]:
+        """
+        :return: time of each factory plus the time of factories of all of its dependencies, by service name
+        """
+        with self._lock:
+            factories = dict(self._factories)
+
+        result = {}
+        closure: typing.Dict[int, typing.Set[int]] = {}
+        for key in topological_order(factories.keys(), lambda k: [dep for dep in factories[k][2] if dep in factories]):
+            name, duration, deps = factories[key]
+            closure[key] = {key}.union(*(closure[dep] for dep in deps if dep in closure))
+            result[name] = sum(factories[k][1] for k in closure[key])
+        return result
+
+    def critical_path(self) -> typing.List[typing.Tuple[str, float]]:
+        """
+        :return: names and factory durations of the chain of dependencies taking the longest to build,
+            i.e. the startup time if all independent factories ran in parallel
+        """
+        with self._lock:
+            factories = dict(self._factories)
+
+        finish: typing.Dict[int, float] = {}
+        previous: typing.Dict[int, typing.Optional[int]] = {}
+        for key in topological_order(factories.keys(), lambda k: [dep for dep in factories[k][2] if dep in factories]):
+            deps = [dep for dep in factories[key][2] if dep in finish]
+            slowest = max(deps, key=finish.__getitem__, default=None)
+            previous[key] = slowest
+            finish[key] = factories[key][1] + (finish[slowest] if slowest is not None else 0.0)
+
+        result = []
+        key = max(finish.keys(), key=finish.__getitem__, default=None)
+        while key is not None:
+            result.append((factories[key][0], factories[key][1]))
+            key = previous[key]
+        result.reverse()
+        return result
+
+    def report(self, top: int = 10) -> str:
+        """
+        :return: the slowest steps and the critical path as text
+        """
+        lines = [f'Slowest steps (top {top}):']
+        slowest = sorted(self.totals().items(), key=lambda item: item[1], reverse=True)[:top]
+        lines.extend(f'  {duration * 1000:10.3f} ms  {category:<13} {name}' for (name, category), duration in slowest)
+
+        path = self.critical_path()
+        lines.append(f'Critical path ({sum(duration for _, duration in path) * 1000:.3f} ms):')
+        lines.extend(f'  {duration * 1000:10.3f} ms  {name}' for name, duration in path)
+        return '\n'.join(lines)
+
+    def chrome_trace(self) -> dict:
+        """
+        :return: events in Chrome trace event format, viewable in chrome://tracing or Perfetto
+        """
+        events = self.events
+        origin = min((event.start for event in events), default=0.0)
+        return {
+            'traceEvents': [
+                {
+                    'name': event.name,
+                    'cat': event.category,
+                    'ph': 'X',
+                    'ts': (event.start - origin) * 1e6,
+                    'dur': event.duration * 1e6,
+                    'pid': os.getpid(),
+                    'tid': event.thread,
+                }
+                for event in events
+            ],
+            'displayTimeUnit': 'ms',
+        }
+
+    def write_chrome_trace(self, path: typing.Union[str, os.PathLike]) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
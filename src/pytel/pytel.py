@@ -1,9 +1,27 @@
+import asyncio
 import collections
+import concurrent.futures
 import contextlib
+import functools
 import logging
+import threading
 import typing
-
-from .context import ObjectDescriptor, to_factory_map
+import weakref
+
+from . import fork
+from .cache import SharedCache
+from .compiler import CompiledGraph
+from .context import ObjectDescriptor, resolution_order, to_factory_map, unresolved_dependencies
+from .eviction import EvictionPolicy
+from .graph import run_concurrently, run_in_background, run_in_parallel, topological_order
+from .manifest import PathType, load_manifest, save_manifest
+from .memory import MemoryTracker
+from .profiler import Profiler
+from .reference import Reference
+from .registry import TypeIndex, mro, select_provider
+from .scope import Evictable, Forbidden, Pool
+from .service import FORBID, SHARE, ServiceSpec
+from .shutdown import ShutdownError, aclose_concurrently, close_concurrently
 
 log = logging.getLogger(__name__)
 
@@ -13,55 +31,646 @@ class Pytel:
             self,
             configurers: typing.Union[object, typing.Iterable[object]],
             parent: typing.Optional['Pytel'] = None,
+            release_references: bool = False,
+            profiler: typing.Optional[Profiler] = None,
+            manifest: typing.Optional[PathType] = None,
+            by_type: bool = False,
+            roots: typing.Optional[typing.Iterable[str]] = None,
+            executor: typing.Optional[concurrent.futures.Executor] = None,
+            cache: typing.Optional[SharedCache] = None,
+            memory: typing.Optional[MemoryTracker] = None,
+            eviction: typing.Optional[EvictionPolicy] = None,
     ):
+        """
+        :param configurers: mapping or object with factories and values, or an iterable of them
+        :param parent: context to take missing dependencies from
+        :param release_references: drop references to factories and dependencies of services once they're created.
+            Equality of descriptors is based on the factory, so it no longer holds for resolved ones.
+            Services can't depend on ones with a fork policy other than share, as they'd be created again.
+        :param profiler: record durations of introspection, validation, factories and context managers
+        :param manifest: path of a file caching the validated graph. If it's up to date with the source modules of
+            factories and types, configurers aren't scanned and nothing is introspected or checked.
+            Otherwise the context is built as usual and the file is (re)written.
+        :param by_type: match dependencies to services by type instead of name. Services of this context are
+            preferred over ones of ancestors; among many services of the type, the one named like the parameter wins.
+        :param roots: names of services to build and check up front, with their dependencies. Other services are
+            introspected and checked on first access, so errors in them only show up then. keys, items and len
+            cover the services built so far. Can't be combined with manifest or by_type, which need all services.
+        :param executor: runs factories of services declared with background=True and their dependencies.
+            By default a thread pool, shut down once they're all created.
+        :param cache: where services declared with shared=True are taken from, required if there are any
+        :param memory: record memory allocated by factories, see memory_report
+        :param eviction: budget of instances of services declared with scope='evictable', which may be shared by
+            many contexts. By default they're only closed with the context.
+        """
+
+        self._init_scope(parent, release_references, profiler, by_type, cache, memory, eviction)
+        self._configure(configurers, manifest, roots)
+        self._start_background(executor)
 
+    def _configure(
+            self,
+            configurers: typing.Union[object, typing.Iterable[object]],
+            manifest: typing.Optional[PathType],
+            roots: typing.Optional[typing.Iterable[str]],
+    ) -> None:
         if configurers is None:
             raise ValueError('configurers is None')
-
-        self._parent = parent
-        self._objects: typing.Dict[str, ObjectDescriptor] = {}
-        self._exit_stack = contextlib.ExitStack()
-
+        parent = self._parent
+        profiler = self._profiler
         if isinstance(configurers, typing.Mapping):
             configurers = [configurers]
         elif configurers is not None and not isinstance(configurers, typing.Iterable):
             configurers = [configurers]
 
-        for configurer in configurers:
-            self._do_configure(configurer)
+        if roots is not None:
+            if manifest is not None or self._by_type:
+                raise ValueError('roots can not be combined with manifest or by_type')
+            self._defer(configurers, roots)
+            return
+
+        if manifest is not None:
+            configurers = list(configurers)
+            loaded = load_manifest(manifest, configurers, parent)
+            if loaded is not None:
+                _check_names(loaded[0].keys())
+                self._objects, self._order = loaded
+                self._resolve_all()
+                return
+
+        sources = [self._do_configure(configurer) for configurer in configurers]
 
         if not self._objects.items():
             log.warning('Empty context')
 
-        all_objects = self._get_all_objects()
-        self._check(all_objects)
-        self._resolve_all(all_objects)
+        if profiler is not None:
+            with profiler.span(f'check {len(self._objects)} services', 'validation'):
+                self._check()
+        else:
+            self._check()
+        self._resolve_all()
+
+        if manifest is not None:
+            try:
+                save_manifest(manifest, self, configurers, sources)
+            except (OSError, ValueError) as e:
+                log.warning('Could not write manifest %s: %s', manifest, e)
+
+    def _start_background(self, executor: typing.Optional[concurrent.futures.Executor]) -> None:
+        order = resolution_order(descr for descr in self._objects.values() if descr._options.background)
+        if not order:
+            return
+
+        owned = executor is None
+        if owned:
+            executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='pytel-background')
+        remaining = [len(order)]
+        logged = set()
+        lock = threading.Lock()
+
+        def done(descr: ObjectDescriptor, future: concurrent.futures.Future) -> None:
+            error = None if future.cancelled() else future.exception()
+            with lock:
+                remaining[0] -= 1
+                if owned and remaining[0] == 0:
+                    executor.shutdown(wait=False)
+                # dependents fail with the error of their dependency
+                first = error is not None and id(error) not in logged
+                if first:
+                    logged.add(id(error))
+            if first:
+                log.warning('Could not create %s in background, creating it on first use', descr.name, exc_info=error)
+
+        futures = run_in_background(order, unresolved_dependencies, ObjectDescriptor._build_once, executor, id)
+        for descr in order:
+            future = descr._future = futures[id(descr)]
+            future.add_done_callback(functools.partial(done, descr))
+        self._background = list(futures.values())
+
+    def _stop_background(self) -> typing.List[concurrent.futures.Future]:
+        """
+        Cancel creating services in background that didn't start yet.
 
-    def _do_configure(self, configurer):
+        :return: futures of the ones still being created, closing must wait for them
+        """
+        return [future for future in self._background if not future.cancel() and not future.done()]
+
+    async def _async_stop_background(self) -> None:
+        running = self._stop_background()
+        if running:
+            await asyncio.wait([asyncio.wrap_future(future) for future in running])
+
+    def _init_scope(
+            self,
+            parent: typing.Optional['Pytel'],
+            release_references: bool = False,
+            profiler: typing.Optional[Profiler] = None,
+            by_type: bool = False,
+            cache: typing.Optional[SharedCache] = None,
+            memory: typing.Optional[MemoryTracker] = None,
+            eviction: typing.Optional[EvictionPolicy] = None,
+    ) -> None:
+        self._parent = parent
+        # contexts created with this one as parent, whose services may hold instances of this one's
+        self._children: 'weakref.WeakSet[Pytel]' = weakref.WeakSet()
+        if parent is not None:
+            parent._children.add(self)
+        self._memory = memory
+        self._eviction = EvictionPolicy() if eviction is None else eviction
+        self._cache = cache
+        self._release_references = release_references
+        self._profiler = profiler
+        self._by_type = by_type
+        self._type_index: typing.Optional[TypeIndex] = None
+        self._providers: typing.Dict[typing.Any, typing.List[ObjectDescriptor]] = {}
+        self._fork_aware = False
+        # services of this context by id of the descriptors they depend on, built on first replace
+        self._dependents: typing.Optional[typing.Dict[int, typing.List[ObjectDescriptor]]] = None
+        self._objects: typing.Dict[str, ObjectDescriptor] = {}
+        self._exit_stack = contextlib.ExitStack()
+        self._async_exit_stack = contextlib.AsyncExitStack()
+        self._order: typing.List[str] = []
+        self._inherited: typing.Dict[str, ObjectDescriptor] = {}
+        # factories of services not built yet, with a lock for building them
+        self._deferred: typing.Dict[str, object] = {}
+        self._deferred_lock: typing.Optional[threading.RLock] = None
+        # futures of services created in background, cancelled or waited for on close
+        self._background: typing.List[concurrent.futures.Future] = []
+
+    def _do_configure(self, configurer) -> typing.KeysView[str]:
         m = to_factory_map(configurer)
+        _check_names(m.keys())
 
         if not self._objects.keys().isdisjoint(m.keys()):
             raise KeyError("Duplicate names", list(set(self._objects.keys()).intersection(m.keys())))
 
-        update = {name: ObjectDescriptor.from_(name, fact) for name, fact in m.items()}
+        update = {name: self._describe(name, fact) for name, fact in m.items()}
         self._objects.update(update)
+        return update.keys()
+
+    def _describe(self, name: str, factory) -> ObjectDescriptor:
+        if self._profiler is not None:
+            with self._profiler.span(name, 'introspection'):
+                return ObjectDescriptor.from_(name, factory)
+        return ObjectDescriptor.from_(name, factory)
+
+    def _defer(self, configurers: typing.Iterable[object], roots: typing.Iterable[str]) -> None:
+        deferred = self._deferred
+        for configurer in configurers:
+            m = to_factory_map(configurer)
+            _check_names(m.keys())
+            if not deferred.keys().isdisjoint(m.keys()):
+                raise KeyError("Duplicate names", list(set(deferred.keys()).intersection(m.keys())))
+            deferred.update(m)
+        if not deferred:
+            log.warning('Empty context')
+
+        roots = list(roots)
+        for name in roots:
+            if name not in deferred:
+                raise KeyError(name)
+        # reentrant, as building services looks up their dependencies
+        self._deferred_lock = threading.RLock()
+        self._expand(roots)
+
+    def _expand(self, names: typing.Iterable[str]) -> None:
+        """
+        Build, check and bind deferred services reachable from the names. On error, they stay deferred.
+        """
+        deferred = self._deferred
+        built = {}
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in built or name not in deferred:
+                continue
+            descr = built[name] = self._describe(name, deferred[name])
+            pending.extend(descr.dependencies.keys())
+
+        # other threads only see the new services once they're bound
+        def find(name):
+            return built[name] if name in built else self._find(name)
+
+        for descr in built.values():
+            self._check_descriptor(descr, find)
+        # services built before don't depend on these ones, so any cycle is among them
+        topological_order(built.keys(), lambda name: (dep for dep in built[name].dependencies.keys() if dep in built))
+        self._bind(self._resolver(find), built.values())
+        self._objects.update(built)
+        self._order = topological_order(self._objects.keys(), self._local_dependencies)
+        self._dependents = None
+        for name in built.keys():
+            del deferred[name]
 
     def _get(self, name: str):
-        if name in self._objects.keys():
-            return self._objects[name].instance
-        elif self._parent is not None:
-            return self._parent._get(name)
+        return self._find(name).instance
+
+    def _find(self, name: str) -> ObjectDescriptor:
+        objects = self._objects
+        if name in objects:
+            return objects[name]
+        inherited = self._inherited
+        if name in inherited:
+            return inherited[name]
+        if self._deferred_lock is not None:
+            with self._deferred_lock:
+                if name in self._deferred:
+                    self._expand([name])
+                if name in objects:
+                    return objects[name]
+        if self._parent is not None:
+            # each context remembers descriptors found in its ancestors, so lookups don't depend on nesting depth
+            descr = inherited[name] = self._parent._find(name)
+            return descr
         else:
             raise KeyError(name)
 
-    def _resolve_all(self, all_objects) -> None:
-        def resolver(name, typ):
-            descriptor = all_objects[name]
+    @contextlib.contextmanager
+    def acquire(self, name: str, timeout: typing.Optional[float] = None):
+        """
+        Borrow an instance of a pooled service for the duration of the with block.
+        Waits for an instance to be released when all the pool_size instances are in use.
+        For an evictable service, keeps its instance from being evicted meanwhile.
+
+        :param timeout: seconds to wait, by default the pool_timeout of the service
+        :raises TimeoutError: if no instance is released in time
+        """
+        pool = self._find(name)._scope
+        if not isinstance(pool, (Pool, Evictable)):
+            raise TypeError(name, f'{name} is not a pooled or evictable service')
+        instance = pool.acquire(timeout)
+        try:
+            yield instance
+        finally:
+            pool.release(instance)
+
+    async def async_get(self, name: str):
+        """
+        Get the named object, awaiting asynchronous factories and context managers in its dependency graph.
+        """
+        return await self._find(name).async_instance()
+
+    def _resolve_all(self) -> None:
+        self._bind(self._resolver())
+
+    def _resolver(
+            self,
+            find: typing.Optional[typing.Callable[[str], ObjectDescriptor]] = None,
+    ) -> typing.Callable[[ObjectDescriptor, str, typing.Type], ObjectDescriptor]:
+        find = find or self._find
+
+        def resolver(descr, name, typ):
+            if self._by_type:
+                return self._provider(descr, name, typ)
+            descriptor = find(name)
             assert issubclass(descriptor.object_type, typ)
             return descriptor
 
-        for value in self._objects.values():
-            value.resolve_dependencies(resolver, self._exit_stack)
+        return resolver
+
+    def _bind(
+            self,
+            resolver: typing.Callable[[ObjectDescriptor, str, typing.Type], ObjectDescriptor],
+            descriptors: typing.Optional[typing.Collection[ObjectDescriptor]] = None,
+    ) -> None:
+        """
+        :param resolver: returns the descriptor of a dependency of the given descriptor, by name and type
+        :param descriptors: descriptors to bind, all of this context by default
+        """
+        if descriptors is None:
+            descriptors = self._objects.values()
+        for value in descriptors:
+            value.resolve_dependencies(
+                functools.partial(resolver, value), self._exit_stack, self._async_exit_stack, self._release_references)
+            value._profiler = self._profiler
+            if value._options.shared and self._cache is None:
+                raise ValueError(value.name, f'{value.name} is shared, which needs a context created with a cache')
+            value._cache = self._cache if value._options.shared else None
+            value._memory = self._memory
+            value._eviction = self._eviction
+        if self._release_references:
+            recreated = self._recreated_after_fork(descriptors)
+            if recreated is not None:
+                raise ValueError(
+                    recreated.name,
+                    f'{recreated.name} has fork policy {recreated._options.fork}, so it and its dependents are '
+                    f'created again in a forked child, which needs factories that a context releasing references drops'
+                )
+        if not self._fork_aware:
+            parent = self._parent
+            # unfinished background work is lost in a forked child, as is the lock for building deferred services,
+            # so contexts with them are tracked too
+            if any(value._options.fork != SHARE or value._options.background for value in self._objects.values()) or \
+                    self._deferred_lock is not None or parent is not None and parent._fork_aware:
+                self._fork_aware = True
+                fork.track(self)
+
+    @staticmethod
+    def _recreated_after_fork(descriptors: typing.Iterable[ObjectDescriptor]) -> typing.Optional[ObjectDescriptor]:
+        """
+        :return: a service with a fork policy other than share among the descriptors and their dependencies
+        """
+        seen = set()
+        stack = list(descriptors)
+        while stack:
+            descr = stack.pop()
+            if id(descr) in seen:
+                continue
+            seen.add(id(descr))
+            if descr._options.fork != SHARE:
+                return descr
+            stack.extend(descr._resolved_deps.values())
+        return None
+
+    def _provider(self, descr: ObjectDescriptor, dep_name: str, dep_type) -> ObjectDescriptor:
+        return select_provider(self._providers_of(dep_type), descr, dep_name, dep_type)
+
+    def _providers_of(self, t) -> typing.List[ObjectDescriptor]:
+        """
+        :return: services of the type from the nearest context having any
+        """
+        providers = self._providers.get(t)
+        if providers is None:
+            ctx = self
+            providers = []
+            while ctx is not None and not providers:
+                if ctx._type_index is None:
+                    ctx._type_index = TypeIndex(ctx._objects.values())
+                providers = ctx._type_index.providers(t)
+                ctx = ctx._parent
+            self._providers[t] = providers
+        return providers
+
+    def _invalidate_types(self) -> None:
+        self._type_index = None
+        self._providers = {}
+
+    def _dependents_of(self, descr: ObjectDescriptor) -> typing.List[ObjectDescriptor]:
+        """
+        :return: services of this context depending directly on the descriptor
+        """
+        if self._dependents is None:
+            dependents = collections.defaultdict(list)
+            for value in self._objects.values():
+                for dep in {id(dep): dep for dep in value._resolved_deps.values()}.values():
+                    dependents[id(dep)].append(value)
+            self._dependents = dependents
+        return self._dependents.get(id(descr), [])
+
+    def _stale(self, descriptors: typing.Iterable[ObjectDescriptor]) -> typing.List[ObjectDescriptor]:
+        """
+        :return: the descriptors and services of this context depending on them, directly or not, dependencies first
+        """
+        found = {id(descr): descr for descr in descriptors}
+        pending = list(found.values())
+        while pending:
+            for dependent in self._dependents_of(pending.pop()):
+                if id(dependent) not in found:
+                    found[id(dependent)] = dependent
+                    pending.append(dependent)
+        return topological_order(
+            found.values(), lambda d: (dep for dep in d._resolved_deps.values() if id(dep) in found), id)
+
+    def replace(self, name: str, factory) -> None:
+        """
+        Replace the factory or value of a service of this context, keeping the rest of the graph.
+        Only the dependencies of the new service and the types its dependents expect are checked.
+        The old instance and the ones of its dependents, in this context and its children, are closed,
+        to be created again on next use; other services keep their instances.
+
+        :raises KeyError: if there's no such service in this context
+        :raises ValueError: if the new service doesn't fit the graph; the context is left unchanged
+        :raises TypeError: if any closed service is an asynchronous context manager, use async_replace
+        :raises ShutdownError: with errors of old instances that failed to close; the service is replaced anyway
+        """
+        errors = {}
+        for stale_name, closer in reversed(self._swap(name, factory, False)):
+            try:
+                closer.close()
+            except Exception as e:
+                errors[stale_name] = e
+        if errors:
+            raise ShutdownError(errors)
+
+    async def async_replace(self, name: str, factory) -> None:
+        """
+        Like replace, also closing asynchronous context managers.
+        """
+        errors = {}
+        for stale_name, closer in reversed(self._swap(name, factory, True)):
+            try:
+                if isinstance(closer, contextlib.AsyncExitStack):
+                    await closer.aclose()
+                else:
+                    closer.close()
+            except Exception as e:
+                errors[stale_name] = e
+        if errors:
+            raise ShutdownError(errors)
+
+    def _swap(self, name: str, factory, allow_async: bool) -> typing.List[typing.Tuple[str, typing.Any]]:
+        """
+        Replace the definition of the service in place, so descriptors depending on it stay valid, and reset dependents.
+
+        :return: names and stacks closing the stale instances, dependencies first
+        """
+        if self._release_references:
+            raise ValueError(name, 'Services can not be replaced in a context releasing references')
+        if self._deferred_lock is not None:
+            with self._deferred_lock:
+                if name in self._deferred:
+                    # nothing was built from it yet
+                    self._deferred[name] = factory
+                    return []
+        descr = self._objects[name]
+        stale = self._stale([descr])
+        compiled = [d.name for d in stale if d._compiled is not None]
+        if not allow_async and any(isinstance(d._closer, contextlib.AsyncExitStack) for d in stale):
+            raise TypeError(name, 'Asynchronous context managers would be closed, use await Pytel.async_replace')
+
+        new = ObjectDescriptor.from_(name, factory)
+        old_type = descr.object_type
+        closer = descr._closer
+        previous = descr._redefine(new)
+        self._invalidate_types()
+        try:
+            self._check_descriptor(descr)
+            dependents = [dependent for ctx in [self, *self._descendants()] for dependent in ctx._dependents_of(descr)]
+            for dependent in dependents:
+                for dep_name, dep in dependent._resolved_deps.items():
+                    dep_type = dependent.dependencies[dep_name]
+                    if dep is descr and not issubclass(descr.object_type, dep_type):
+                        raise ValueError(
+                            f'{dependent.name}: {dependent.object_type.__name__} has dependency {dep_name}:'
+                            f' {dep_type.__name__}, but {name} is type {descr.object_type.__name__}')
+            topological_order([name], self._local_dependencies)
+            if self._by_type:
+                # other services may now resolve to the new one, or find it ambiguous
+                affected = set(mro(old_type)).union(mro(descr.object_type))
+                for other in self._objects.values():
+                    for dep_name, dep_type in other.dependencies.items():
+                        if dep_type in affected and \
+                                self._provider(other, dep_name, dep_type) is not other._resolved_deps[dep_name]:
+                            raise ValueError(f'Replacing {name} changes the dependency {other.name} => {dep_name}')
+            # last, as binding registers the context for fork policies of the new service
+            self._bind(self._resolver(), [descr])
+        except BaseException:
+            descr._restore(previous)
+            self._invalidate_types()
+            raise
+
+        if compiled:
+            log.warning('Replacing %s dropped the compiled resolvers of %s, compile the context again',
+                        name, ', '.join(compiled))
+        self._dependents = None
+        self._order = topological_order(self._objects.keys(), self._local_dependencies)
+        closers = [(name, closer)]
+        for dependent in stale[1:]:
+            dependent._update_proxied()
+            closers.append((dependent.name, dependent._reset()))
+        for d in stale:
+            self.__dict__.pop(d.name, None)
+        closers.extend(self._reset_children({id(d) for d in stale}))
+        return [(stale_name, closer) for stale_name, closer in closers if closer is not None]
+
+    def _descendants(self) -> typing.List['Pytel']:
+        result = []
+        pending = list(self._children)
+        while pending:
+            child = pending.pop()
+            result.append(child)
+            pending.extend(child._children)
+        return result
+
+    def _reset_children(self, reset: typing.Set[int]) -> typing.List[typing.Tuple[str, typing.Any]]:
+        """
+        Reset services of child contexts depending on the reset ones of this context, and forget instances of them
+        stored as attributes of the children.
+
+        :return: names and stacks closing the stale instances, dependencies first
+        """
+        closers = []
+        for child in list(self._children):
+            child_reset = set(reset)
+            for name, descr in child._inherited.items():
+                if id(descr) in reset:
+                    child.__dict__.pop(name, None)
+            roots = [
+                descr for descr in child._objects.values()
+                if any(id(dep) in reset for dep in descr._resolved_deps.values())
+            ]
+            for descr in child._stale(roots):
+                descr._update_proxied()
+                closers.append((descr.name, descr._reset()))
+                child_reset.add(id(descr))
+                child.__dict__.pop(descr.name, None)
+            closers.extend(child._reset_children(child_reset))
+        return closers
+
+    def _after_fork(self, reset: typing.Set[int]) -> None:
+        """
+        Apply fork policies in a child process: reset services that aren't shared, and their dependents.
+
+        :param reset: ids of descriptors reset in ancestors, updated with the ones of this context
+        """
+        if self._deferred_lock is not None:
+            self._deferred_lock = threading.RLock()
+        self._background = []
+        roots = []
+        for descr in self._objects.values():
+            # held by threads that don't exist in the child, as is unfinished background work
+            descr._lock = None
+            if descr._future is not None and not descr._future.done():
+                descr._future = None
+            created = descr._instance is not None or descr._scope is not None
+            if (created and descr._options.fork != SHARE) or \
+                    any(id(dep) in reset for dep in descr._resolved_deps.values()):
+                roots.append(descr)
+        # instances of ancestors' services stored as attributes of this context
+        for name, descr in self._inherited.items():
+            if id(descr) in reset:
+                self.__dict__.pop(name, None)
+        if not roots:
+            return
+
+        self._dependents = None
+        for descr in self._stale(roots):
+            created = descr._instance is not None or isinstance(descr._scope, Forbidden)
+            closer = descr._reset()
+            if closer is not None:
+                # resources belong to the parent, which closes them
+                closer.pop_all()
+            if created and descr._options.fork == FORBID:
+                descr._scope = Forbidden(descr)
+            reset.add(id(descr))
+            self.__dict__.pop(descr.name, None)
+
+    def warm_up(self, max_workers: typing.Optional[int] = None) -> None:
+        """
+        Instantiate all services ahead of the first reference.
+        Factories whose dependencies are ready run concurrently on a thread pool of max_workers threads.
+        Context managers are entered after their dependencies, so they're still closed in reverse dependency order.
+        Lazy services are left until their first use.
+        """
+        order = resolution_order(descr for descr in self._objects.values() if not descr._options.lazy)
+        if max_workers == 1 or len(order) <= 1:
+            for descr in order:
+                descr._resolve_once()
+            return
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            run_in_parallel(order, unresolved_dependencies, ObjectDescriptor._resolve_once, executor, id)
+
+    async def async_warm_up(self) -> None:
+        """
+        Instantiate all services ahead of the first reference, awaiting independent asynchronous factories concurrently.
+        Lazy services are left until their first use.
+        """
+        order = resolution_order(descr for descr in self._objects.values() if not descr._options.lazy)
+        await run_concurrently(order, unresolved_dependencies, ObjectDescriptor._resolve_async, id)
+
+    def preimport(self) -> threading.Thread:
+        """
+        Import factories given by Reference on a background thread, so that they're likely ready by first use.
+        Errors are left to the resolution of the service.
+
+        :return: the started daemon thread
+        """
+        factories = [descr._factory for descr in self._objects.values()]
+        factories.extend(
+            factory.factory if isinstance(factory, ServiceSpec) else factory for factory in self._deferred.values())
+        references = [factory for factory in factories if isinstance(factory, Reference)]
+
+        def run():
+            for reference in references:
+                try:
+                    reference.load()
+                except Exception as e:
+                    log.debug('Could not import %s: %r', reference.path, e)
+
+        thread = threading.Thread(target=run, name='pytel-preimport', daemon=True)
+        thread.start()
+        return thread
+
+    def memory_report(self, top: int = 10) -> str:
+        """
+        :return: services of this context whose factories allocated the most memory so far, as text
+        :raises ValueError: if the context was created without a MemoryTracker
+        """
+        if self._memory is None:
+            raise ValueError('Memory is tracked only for contexts created with memory=MemoryTracker()')
+        return self._memory.report(top, self._objects.values())
+
+    def compile(self) -> CompiledGraph:
+        """
+        Generate straight-line resolvers for the services of this context and use them for further resolution.
+        Replacing a service drops the resolvers of it and its dependents, until the context is compiled again.
+
+        :raises ValueError: if the context has a profiler
+        """
+        result = CompiledGraph(self)
+        result.bind(self)
+        return result
 
     def keys(self):
         return self._objects.keys()
@@ -73,69 +682,122 @@ class Pytel:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
+        concurrent.futures.wait(self._stop_background())
         self._exit_stack.__exit__(exc_type, exc_val, exc_tb)
 
     def close(self):
+        concurrent.futures.wait(self._stop_background())
         return self._exit_stack.close()
 
+    def shutdown(
+            self,
+            max_workers: typing.Optional[int] = None,
+            timeout: typing.Optional[float] = None,
+            timeouts: typing.Optional[typing.Mapping[str, float]] = None,
+    ) -> None:
+        """
+        Close context managers of this context following the dependency graph: services are closed after their
+        dependents, independent ones concurrently on a thread pool of max_workers threads.
+
+        :param timeout: default time limit in seconds to close a service
+        :param timeouts: time limits by service name
+        :raises ShutdownError: with errors of all services that failed to close or didn't close in time
+        """
+        concurrent.futures.wait(self._stop_background())
+        try:
+            close_concurrently(self._objects.values(), max_workers, timeout, timeouts)
+        finally:
+            self._exit_stack.close()
+
+    async def async_shutdown(
+            self,
+            timeout: typing.Optional[float] = None,
+            timeouts: typing.Optional[typing.Mapping[str, float]] = None,
+    ) -> None:
+        """
+        Like shutdown, but closing independent services as asyncio tasks, including asynchronous context managers.
+        """
+        await self._async_stop_background()
+        try:
+            await aclose_concurrently(self._objects.values(), timeout, timeouts)
+        finally:
+            await self.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self._async_stop_background()
+        self._async_exit_stack.enter_context(self._exit_stack.pop_all())
+        return await self._async_exit_stack.__aexit__(exc_type, exc_val, exc_tb)
+
+    async def aclose(self):
+        """
+        Close both synchronous and asynchronous context managers, in reverse order of entering them.
+        """
+        await self._async_stop_background()
+        self._async_exit_stack.enter_context(self._exit_stack.pop_all())
+        await self._async_exit_stack.aclose()
+
     def __getattr__(self, name: str):
         try:
-            return self._get(name)
+            descr = self._find(name)
         except KeyError as e:
             raise AttributeError(name) from e
+        instance = descr.instance
+        if descr._instance is instance:
+            # singletons are stored as attributes, so next access doesn't go through __getattr__
+            self.__dict__[name] = instance
+        return instance
 
     def __len__(self):
         return len(self._objects)
 
     def __contains__(self, item):
-        return item in self._objects
-
-    def _get_all_objects(self):
-        p = self
-        result = [self._objects]
-
-        while p._parent is not None:
-            p = p._parent
-            result.append(p._objects)
-        return collections.ChainMap(*result)
-
-    def _check(self, all_objects):
-        def check_defs(descr: ObjectDescriptor, all: typing.Mapping[str, ObjectDescriptor]):
-            for dep_name, dep_type in descr.dependencies.items():
-                if dep_name not in all.keys():
-                    raise ValueError(f'Unresolved dependency of {descr.name} => {dep_name}: {dep_type}')
-                if not issubclass(all[dep_name].object_type, dep_type):
-                    raise ValueError(
-                        f'{descr.name}: {descr.object_type.__name__} has dependency {dep_name}: {dep_type.__name__},'
-                        f' but {dep_name} is type {all[dep_name].object_type.__name__}')
+        return item in self._objects or item in self._deferred
 
+    def _check(self):
         for descr in self._objects.values():
-            check_defs(descr, all_objects)
+            self._check_descriptor(descr)
 
-        for descr in self._objects.values():
-            self._check_cycles(descr)
+        self._order = topological_order(self._objects.keys(), self._local_dependencies)
 
-    def _check_cycles(
+    def _check_descriptor(
             self,
             descr: ObjectDescriptor,
-            stack: typing.Optional[typing.List[str]] = None,
-            clean: typing.Optional[typing.List[str]] = None,
+            find: typing.Optional[typing.Callable[[str], ObjectDescriptor]] = None,
     ) -> None:
         """
-        :param descr:
-        :param stack: reverse dependency path (excluding the current descriptor)
-        :param clean:
+        :param find: lookup of dependencies by name, _find by default
         """
-
-        if stack is None:
-            stack = []
-            clean = []
-
-        if descr.name in stack:
-            raise ValueError(f'{descr.name} depends on itself. Dependency path: {stack + [descr.name]}')
-
-        for dep_name in descr.dependencies.keys():
-            if dep_name not in clean and dep_name in self._objects.keys():
-                self._check_cycles(self._objects[dep_name], stack + [descr.name], clean)
-
-        clean.append(descr.name)
+        find = find or self._find
+        for dep_name, dep_type in descr.dependencies.items():
+            if self._by_type:
+                self._provider(descr, dep_name, dep_type)
+                continue
+            try:
+                dep = find(dep_name)
+            except KeyError:
+                raise ValueError(f'Unresolved dependency of {descr.name} => {dep_name}: {dep_type}') from None
+            if not issubclass(dep.object_type, dep_type):
+                raise ValueError(
+                    f'{descr.name}: {descr.object_type.__name__} has dependency {dep_name}: {dep_type.__name__},'
+                    f' but {dep_name} is type {dep.object_type.__name__}')
+
+    def _local_dependencies(self, name: str) -> typing.Iterable[str]:
+        descr = self._objects[name]
+        if self._by_type:
+            deps = (self._provider(descr, dep_name, dep_type) for dep_name, dep_type in descr.dependencies.items())
+            return (dep.name for dep in deps if self._objects.get(dep.name) is dep)
+        return (dep_name for dep_name in descr.dependencies.keys() if dep_name in self._objects)
+
+
+# services with these names would be shadowed by the methods; ones named like the oldest methods are still allowed,
+# as they always were, being reachable as dependencies
+_METHODS = frozenset(name for name in dir(Pytel) if not name.startswith('_')) - {'keys', 'items', 'close'}
+
+
+def _check_names(names: typing.Iterable[str]) -> None:
+    taken = _METHODS.intersection(names)
+    if taken:
+        raise ValueError('Names of Pytel methods', sorted(taken))
@@ -0,0 +1,76 @@
+import importlib
+import sys
+import typing
+
+from .lazy import unwrap_lazy
+
+T = typing.TypeVar('T')
+
+
+def resolve_path(path: str):
+    """
+    :param path: 'module:qualname' reference
+    :return: the referenced object, importing its module if needed
+    """
+    module, qualname = path.split(':')
+    result = sys.modules.get(module) or importlib.import_module(module)
+    for part in qualname.split('.'):
+        result = getattr(result, part)
+    return result
+
+
+class Reference(typing.Generic[T]):
+    """
+    Factory given by a 'package.module:factory' path, imported on first call.
+    The type and dependencies are declared, since the factory can't be introspected without importing it::
+
+        Pytel({'model': Reference('app.ml:load_model', Model, {'config': Config})})
+    """
+
+    def __init__(
+            self,
+            path: str,
+            _type: typing.Type[T],
+            dependencies: typing.Optional[typing.Mapping[str, typing.Any]] = None,
+    ):
+        """
+        :param path: module and qualified name of the factory, separated by a colon
+        :param _type: type of objects produced by the factory
+        :param dependencies: types of arguments of the factory by name, may be annotated as Lazy
+        """
+        if path.count(':') != 1:
+            raise ValueError(f"Expected 'package.module:factory', got {path!r}")
+        self.path = path
+        self.type = _type
+        self.dependencies = dict(dependencies or {})
+        self._target: typing.Optional[typing.Callable[..., T]] = None
+
+    def load(self) -> typing.Callable[..., T]:
+        """
+        Import the factory, unless it's already imported.
+        """
+        target = self._target
+        if target is None:
+            target = resolve_path(self.path)
+            if not callable(target):
+                raise TypeError(self.path, f'{self.path} is not callable')
+            self._target = target
+        return target
+
+    def introspect(self) -> typing.Tuple[typing.Type[T], typing.Dict[str, typing.Type], typing.FrozenSet[str]]:
+        """
+        :return: same as pytel.context.introspect, from the declarations
+        """
+        deps = {}
+        lazy_deps = set()
+        for dep_name, annotation in self.dependencies.items():
+            deps[dep_name], is_lazy = unwrap_lazy(annotation)
+            if is_lazy:
+                lazy_deps.add(dep_name)
+        return self.type, deps, frozenset(lazy_deps)
+
+    def __call__(self, **kwargs) -> T:
+        return self.load()(**kwargs)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> {self.path}'
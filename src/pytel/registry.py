@@ -0,0 +1,54 @@
+import collections
+import typing
+
+from .context import ObjectDescriptor
+
+
+def mro(t) -> typing.Tuple[typing.Any, ...]:
+    """
+    :return: the type and its bases, or just the given object if it's not a class
+    """
+    return getattr(t, '__mro__', (t,))
+
+
+class TypeIndex:
+    """
+    Services of one context by every class in the MRO of their types, except object.
+    Virtual subclasses registered with ABCs aren't in the MRO, so they're not indexed.
+    """
+
+    def __init__(self, objects: typing.Iterable[ObjectDescriptor]):
+        self._providers: typing.Dict[typing.Any, typing.List[ObjectDescriptor]] = collections.defaultdict(list)
+        for descr in objects:
+            for cls in mro(descr.object_type):
+                if cls is not object:
+                    self._providers[cls].append(descr)
+
+    def providers(self, t) -> typing.List[ObjectDescriptor]:
+        return self._providers.get(t, [])
+
+
+def select_provider(
+        candidates: typing.Sequence[ObjectDescriptor],
+        dependent: ObjectDescriptor,
+        dep_name: str,
+        dep_type,
+) -> ObjectDescriptor:
+    """
+    Pick the provider of a dependency among services of the right type.
+    The dependent itself is never its own provider; with many candidates, the one named like the dependency wins.
+
+    :raises ValueError: if there's no candidate, or many and none of them is named like the dependency
+    """
+    candidates = [descr for descr in candidates if descr is not dependent]
+    if len(candidates) == 1:
+        return candidates[0]
+    type_name = getattr(dep_type, '__name__', dep_type)
+    if not candidates:
+        raise ValueError(f'Unresolved dependency of {dependent.name} => {dep_name}: {type_name}')
+    for descr in candidates:
+        if descr.name == dep_name:
+            return descr
+    raise ValueError(
+        f'Ambiguous dependency of {dependent.name} => {dep_name}: {type_name},'
+        f' provided by {", ".join(sorted(descr.name for descr in candidates))}')
@@ -0,0 +1,218 @@
+import contextlib
+import inspect
+import threading
+import typing
+import weakref
+
+from .service import EVICTABLE, POOLED, SINGLETON, THREAD, TRANSIENT
+
+if typing.TYPE_CHECKING:
+    from .context import ObjectDescriptor
+
+
+class Transient:
+    """
+    A new instance on every resolution. Context managers aren't allowed, as nothing would close them before the context.
+    """
+
+    def __init__(self, descr: 'ObjectDescriptor'):
+        self._descr = descr
+
+    def get(self):
+        return self._descr._create(self._reject)
+
+    def _reject(self, context_manager):
+        name = self._descr.name
+        raise TypeError(name, f'{name} is transient and can not be a context manager, use scope thread or pooled')
+
+
+class _Holder:
+    __slots__ = ('instance', '__weakref__')
+
+    def __init__(self, instance):
+        self.instance = instance
+
+
+class ThreadLocal:
+    """
+    One instance per thread, closed when the thread ends if it's a context manager.
+    """
+
+    def __init__(self, descr: 'ObjectDescriptor'):
+        self._descr = descr
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # stacks closing instances of threads that are still running, by id
+        self._stacks: typing.Dict[int, contextlib.ExitStack] = {}
+        self._registered = False
+
+    def get(self):
+        holder = getattr(self._local, 'holder', None)
+        if holder is None:
+            holder = self._local.holder = self._create()
+        return holder.instance
+
+    def _create(self) -> _Holder:
+        with self._lock:
+            if not self._registered:
+                self._descr._scoped_closer().callback(self._close)
+                self._registered = True
+        stack = contextlib.ExitStack()
+        try:
+            holder = _Holder(self._descr._create(stack.enter_context))
+        except BaseException:
+            stack.close()
+            raise
+        with self._lock:
+            self._stacks[id(stack)] = stack
+        # thread-local data is dropped when its thread ends
+        weakref.finalize(holder, self._close_thread, id(stack))
+        return holder
+
+    def _close_thread(self, key: int) -> None:
+        with self._lock:
+            stack = self._stacks.pop(key, None)
+        if stack is not None:
+            stack.close()
+
+    def _close(self) -> None:
+        with self._lock:
+            stacks = list(self._stacks.values())
+            self._stacks.clear()
+        for stack in reversed(stacks):
+            stack.close()
+
+
+class Pool:
+    """
+    Up to size instances, created on demand and reused once released.
+    """
+
+    def __init__(self, descr: 'ObjectDescriptor', size: int, timeout: typing.Optional[float]):
+        self._descr = descr
+        self._size = size
+        self._timeout = timeout
+        self._idle: typing.List[typing.Any] = []
+        self._created = 0
+        # instances acquired and not released yet, by id
+        self._borrowed: typing.Dict[int, typing.Any] = {}
+        self._condition = threading.Condition()
+
+    def get(self):
+        raise TypeError(self._descr.name, f'{self._descr.name} is pooled, use Pytel.acquire')
+
+    def acquire(self, timeout: typing.Optional[float] = None):
+        """
+        :param timeout: seconds to wait for an instance, by default the pool_timeout of the service
+        :raises TimeoutError: if all instances stay borrowed for the whole timeout
+        """
+        if timeout is None:
+            timeout = self._timeout
+        condition = self._condition
+        with condition:
+            if not condition.wait_for(lambda: self._idle or self._created < self._size, timeout):
+                raise TimeoutError(self._descr.name, f'No instance of {self._descr.name} released within {timeout}s')
+            if self._idle:
+                instance = self._idle.pop()
+                self._borrowed[id(instance)] = instance
+                return instance
+            self._created += 1
+        # other threads can take released instances while this one is created
+        try:
+            instance = self._descr._create()
+        except BaseException:
+            with condition:
+                self._created -= 1
+                condition.notify()
+            raise
+        with condition:
+            self._borrowed[id(instance)] = instance
+        return instance
+
+    def release(self, instance) -> None:
+        """
+        :raises ValueError: if the instance wasn't acquired from this pool, or was released already
+        """
+        with self._condition:
+            if self._borrowed.pop(id(instance), None) is not instance:
+                name = self._descr.name
+                raise ValueError(name, f'Instance of {name} was not acquired from its pool')
+            self._idle.append(instance)
+            self._condition.notify()
+
+
+class Evictable:
+    """
+    One instance at a time, which the EvictionPolicy of the context may close and drop; it's created again on next use.
+    """
+
+    def __init__(self, descr: 'ObjectDescriptor'):
+        self._descr = descr
+        self._lock = threading.Lock()
+        self._registered = False
+
+    def get(self):
+        return self._get(False)
+
+    def acquire(self, timeout: typing.Optional[float] = None):
+        """
+        :return: the instance, kept from eviction until it's released
+        """
+        return self._get(True)
+
+    def _get(self, pin: bool):
+        descr = self._descr
+        policy = descr._eviction
+        instance = policy.get(self, pin)
+        if instance is not None:
+            return instance
+        with self._lock:
+            instance = policy.get(self, pin)
+            if instance is None:
+                if not self._registered:
+                    # whichever instance is kept at the time is closed with the context
+                    descr._scoped_closer().callback(policy.discard, self)
+                    self._registered = True
+                instance = policy.create(self, lambda stack: descr._create(stack.enter_context), pin)
+        return instance
+
+    def release(self, instance) -> None:
+        self._descr._eviction.unpin(self)
+
+
+class Forbidden:
+    """
+    Stands for an instance created by the parent process, that a forked child can't use.
+    """
+
+    def __init__(self, descr: 'ObjectDescriptor'):
+        self._descr = descr
+
+    def get(self):
+        name = self._descr.name
+        raise RuntimeError(name, f'{name} was created before fork and can not be used in a child')
+
+
+ScopeType = typing.Union[Transient, ThreadLocal, Pool, Evictable, Forbidden]
+
+
+def new_scope(descr: 'ObjectDescriptor') -> typing.Optional[ScopeType]:
+    """
+    :return: holder of instances of the descriptor, or None for singletons kept by the descriptor itself
+    """
+    options = descr._options
+    if options.scope == SINGLETON:
+        return None
+    if descr._factory is None:
+        raise ValueError(descr.name, f'Service {descr.name} in scope {options.scope} needs a factory')
+    if inspect.iscoroutinefunction(descr._factory):
+        raise ValueError(descr.name, f'Service {descr.name} in scope {options.scope} needs a synchronous factory')
+    if options.scope == TRANSIENT:
+        return Transient(descr)
+    elif options.scope == THREAD:
+        return ThreadLocal(descr)
+    elif options.scope == POOLED:
+        return Pool(descr, options.pool_size, options.pool_timeout)
+    elif options.scope == EVICTABLE:
+        return Evictable(descr)
+    raise ValueError(descr.name, f'Unknown scope {options.scope!r}')
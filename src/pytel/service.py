@@ -0,0 +1,87 @@
+import collections
+
+SINGLETON = 'singleton'
+TRANSIENT = 'transient'
+THREAD = 'thread'
+POOLED = 'pooled'
+EVICTABLE = 'evictable'
+SCOPES = (SINGLETON, TRANSIENT, THREAD, POOLED, EVICTABLE)
+
+SHARE = 'share'
+REINIT = 'reinit'
+FORBID = 'forbid'
+FORK_POLICIES = (SHARE, REINIT, FORBID)
+
+Options = collections.namedtuple(
+    'Options',
+    ['lazy', 'scope', 'pool_size', 'pool_timeout', 'fork', 'background', 'shared'],
+    defaults=[False, SINGLETON, None, None, SHARE, False, False],
+)
+Options.__doc__ = """
+How a service is created.
+
+lazy: dependents receive a LazyProxy, and the service is built on the first use of the proxy
+scope: lifetime of instances
+    singleton: one instance per context, created on first use
+    transient: a new instance every time the service is resolved, which can't be a context manager
+    thread: one instance per thread, closed when the thread ends if it's a context manager
+    pooled: up to pool_size instances, borrowed with Pytel.acquire; other services can't depend on it
+    evictable: one instance, closed and dropped by the EvictionPolicy of the context when over its budget,
+        and created again on next use. Dependents receive a LazyProxy; Pytel.acquire keeps it from eviction.
+    Instances of scoped services are created synchronously. Context managers still open are closed with the context.
+pool_size: maximum number of instances of a pooled service
+pool_timeout: default time limit in seconds to wait for an instance of a pooled service, None waits indefinitely
+fork: what a child process does with instances created before os.fork
+    share: keep using them
+    reinit: create new ones on next use, without closing the ones of the parent
+    forbid: fail on use
+    Dependents of services that aren't shared are created again too.
+background: create the singleton and its dependencies on an executor as soon as the context is constructed.
+    Using it waits until it's ready, and raises the error of its factory if it failed.
+shared: take the singleton from the SharedCache the context was created with, reusing the instance of any context with the same
+    factory and dependencies. Context managers are closed when evicted from the cache, not with the context.
+"""
+
+DEFAULT_OPTIONS = Options()
+
+
+class ServiceSpec:
+    """
+    A factory or value together with options of its service.
+    Works as a method decorator too, binding the factory like a regular method.
+    """
+    __slots__ = ('factory', 'options')
+
+    def __init__(self, factory, options: Options):
+        self.factory = factory
+        self.options = options
+
+    def __get__(self, instance, owner=None):
+        get = getattr(self.factory, '__get__', None)
+        if get is None:
+            return self
+        return ServiceSpec(get(instance, owner), self.options)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}> {self.factory!r} {self.options}'
+
+
+def service(factory=None, **options):
+    """
+    Declare options of a service, e.g. ``service(load_model, lazy=True)`` in a configurer dictionary,
+    or ``@service(lazy=True)`` on a configurer method.
+    """
+    options = Options(**options)
+    if options.scope not in SCOPES:
+        raise ValueError(f'Unknown scope {options.scope!r}, expected one of {", ".join(SCOPES)}')
+    if options.fork not in FORK_POLICIES:
+        raise ValueError(f'Unknown fork policy {options.fork!r}, expected one of {", ".join(FORK_POLICIES)}')
+    if options.background and options.scope != SINGLETON:
+        raise ValueError('Only singletons can be created in background')
+    if options.shared and options.scope != SINGLETON:
+        raise ValueError('Only singletons can be shared')
+    if options.scope == POOLED and (options.pool_size is None or options.pool_size < 1):
+        raise ValueError('Pooled service needs a positive pool_size')
+    if factory is None:
+        return lambda f: ServiceSpec(f, options)
+    return ServiceSpec(factory, options)
@@ -0,0 +1,205 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import time
+import typing
+
+from .context import ObjectDescriptor
+from .graph import topological_order
+
+log = logging.getLogger(__name__)
+
+
+class ShutdownError(Exception):
+    """
+    Services that failed to close or didn't close in time, by name.
+    """
+
+    def __init__(self, errors: typing.Dict[str, BaseException]):
+        super().__init__(f'Failed to close {", ".join(errors.keys())}', errors)
+        self.errors = errors
+
+
+class _ShutdownPlan:
+    def __init__(
+            self,
+            descriptors: typing.Iterable[ObjectDescriptor],
+            timeout: typing.Optional[float],
+            timeouts: typing.Optional[typing.Mapping[str, float]],
+    ):
+        # services that aren't singletons are planned even without instances to close, as their instances may hold
+        # instances of their dependencies
+        self.nodes = {
+            id(descr): descr for descr in descriptors if descr._instance is not None or descr._scope is not None
+        }
+        self.dependencies = {
+            key: {id(dep) for dep in descr._resolved_deps.values() if id(dep) in self.nodes}
+            for key, descr in self.nodes.items()
+        }
+        self.dependents: typing.Dict[int, typing.List[int]] = {key: [] for key in self.nodes.keys()}
+        for key, deps in self.dependencies.items():
+            for dep_key in deps:
+                self.dependents[dep_key].append(key)
+        self._timeout = timeout
+        self._timeouts = timeouts or {}
+        self.errors: typing.Dict[str, BaseException] = {}
+
+    def timeout(self, key: int) -> typing.Optional[float]:
+        return self._timeouts.get(self.nodes[key].name, self._timeout)
+
+    def timed_out(self, key: int) -> None:
+        name = self.nodes[key].name
+        self.errors[name] = TimeoutError(f'{name} did not close within {self.timeout(key)}s')
+
+    def failed(self, key: int, error: BaseException) -> None:
+        self.errors[self.nodes[key].name] = error
+
+    def leave_open(self, keys: typing.Iterable[int]) -> None:
+        """
+        Detach the services still closing, and everything they depend on, from their closers,
+        so that closing the context later doesn't close them either.
+        """
+        pending = list(keys)
+        seen = set(pending)
+        while pending:
+            key = pending.pop()
+            descr = self.nodes[key]
+            if descr._closer is not None:
+                descr._closer.pop_all()
+                if descr.name not in self.errors:
+                    log.warning('Leaving %s open, as a service depending on it did not close in time', descr.name)
+            for dep_key in self.dependencies[key]:
+                if dep_key not in seen:
+                    seen.add(dep_key)
+                    pending.append(dep_key)
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            raise ShutdownError(self.errors)
+
+
+def _close(descr: ObjectDescriptor) -> None:
+    closer = descr._closer
+    if isinstance(closer, contextlib.AsyncExitStack):
+        raise TypeError(descr.name, f"'{descr.name}' is an asynchronous context manager, use Pytel.async_shutdown")
+    closer.close()
+
+
+def close_concurrently(
+        descriptors: typing.Iterable[ObjectDescriptor],
+        max_workers: typing.Optional[int] = None,
+        timeout: typing.Optional[float] = None,
+        timeouts: typing.Optional[typing.Mapping[str, float]] = None,
+) -> None:
+    """
+    Close context managers of resolved services on a thread pool, each one after all services that depend on it.
+    A service that doesn't close in time is reported and no longer waited for, but its thread keeps running;
+    the services it depends on are left open, so that they aren't closed under it.
+
+    :param timeout: default time limit in seconds to close a service
+    :param timeouts: time limits by service name
+    :raises ShutdownError: if any service failed to close in time
+    """
+    plan = _ShutdownPlan(descriptors, timeout, timeouts)
+    waiting_for = {key: len(dependents) for key, dependents in plan.dependents.items()}
+    running: typing.Dict[concurrent.futures.Future, typing.Tuple[int, typing.Optional[float]]] = {}
+    timed_out: typing.List[int] = []
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers)
+
+    def start(keys: typing.Iterable[int]) -> None:
+        queue = list(keys)
+        while queue:
+            key = queue.pop()
+            descr = plan.nodes[key]
+            if descr._closer is None:
+                queue.extend(closed(key))
+            else:
+                key_timeout = plan.timeout(key)
+                deadline = None if key_timeout is None else time.monotonic() + key_timeout
+                running[executor.submit(_close, descr)] = key, deadline
+
+    def closed(key: int) -> typing.List[int]:
+        ready = []
+        for dep_key in plan.dependencies[key]:
+            waiting_for[dep_key] -= 1
+            if waiting_for[dep_key] == 0:
+                ready.append(dep_key)
+        return ready
+
+    try:
+        start(key for key, count in waiting_for.items() if count == 0)
+        while running:
+            deadlines = [deadline for _, deadline in running.values() if deadline is not None]
+            wait_time = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            finished, _ = concurrent.futures.wait(
+                running.keys(), timeout=wait_time, return_when=concurrent.futures.FIRST_COMPLETED)
+            now = time.monotonic()
+            for future, (key, deadline) in list(running.items()):
+                if future in finished:
+                    del running[future]
+                    if future.exception() is not None:
+                        plan.failed(key, future.exception())
+                    start(closed(key))
+                elif deadline is not None and deadline <= now:
+                    # dependencies aren't closed while it may still use them
+                    del running[future]
+                    plan.timed_out(key)
+                    timed_out.append(key)
+    finally:
+        # only closers that timed out are still running, their dependencies are never started
+        plan.leave_open(timed_out)
+        executor.shutdown(wait=False)
+    plan.raise_errors()
+
+
+async def aclose_concurrently(
+        descriptors: typing.Iterable[ObjectDescriptor],
+        timeout: typing.Optional[float] = None,
+        timeouts: typing.Optional[typing.Mapping[str, float]] = None,
+) -> None:
+    """
+    Close context managers of resolved services as asyncio tasks, each one after all services that depend on it.
+    Synchronous ones are closed in the default executor. A service that doesn't close in time is reported;
+    an asynchronous one is cancelled, while a synchronous one keeps running and the services it depends on are left open.
+
+    :param timeout: default time limit in seconds to close a service
+    :param timeouts: time limits by service name
+    :raises ShutdownError: if any service failed to close in time
+    """
+    plan = _ShutdownPlan(descriptors, timeout, timeouts)
+    loop = asyncio.get_running_loop()
+
+    async def close(key: int, dependents: typing.List[asyncio.Future]) -> bool:
+        """
+        :return: False if the service may still be closing, or is left open
+        """
+        if dependents:
+            await asyncio.wait(dependents)
+            if not all(dependent.result() for dependent in dependents):
+                return False
+        closer = plan.nodes[key]._closer
+        if closer is None:
+            return True
+        if isinstance(closer, contextlib.AsyncExitStack):
+            closing = closer.aclose()
+        else:
+            closing = loop.run_in_executor(None, closer.close)
+        try:
+            await asyncio.wait_for(closing, plan.timeout(key))
+        except asyncio.TimeoutError:
+            plan.timed_out(key)
+            # the thread closing a synchronous one can't be cancelled
+            return isinstance(closer, contextlib.AsyncExitStack)
+        except Exception as e:
+            plan.failed(key, e)
+        return True
+
+    tasks: typing.Dict[int, asyncio.Future] = {}
+    order = topological_order(plan.nodes.keys(), plan.dependencies.__getitem__)
+    for key in reversed(order):
+        tasks[key] = asyncio.ensure_future(close(key, [tasks[dependent] for dependent in plan.dependents[key]]))
+    if tasks:
+        await asyncio.wait(tasks.values())
+    plan.leave_open(key for key, task in tasks.items() if not task.result())
+    plan.raise_errors()
@@ -0,0 +1,95 @@
+import concurrent.futures
+import typing
+
+from .cache import SharedCache
+from .compiler import CompiledGraph
+from .context import ObjectDescriptor
+from .eviction import EvictionPolicy
+from .memory import MemoryTracker
+from .profiler import Profiler
+from .pytel import Pytel
+
+
+class PytelTemplate:
+    """
+    Validated configuration of a child context, for creating many short-lived scopes of the same parent.
+
+    Configurers are read, introspected and checked against the parent once;
+    create() then only copies the descriptors and binds their dependencies.
+    With compiled=True, scopes use resolvers generated once for the template (see CompiledGraph).
+    Services declared with background=True start in background in each new scope, not in the template.
+    """
+
+    def __init__(
+            self,
+            configurers: typing.Union[object, typing.Iterable[object]],
+            parent: typing.Optional[Pytel] = None,
+            compiled: bool = False,
+            release_references: bool = False,
+            profiler: typing.Optional[Profiler] = None,
+            by_type: bool = False,
+            cache: typing.Optional[SharedCache] = None,
+            memory: typing.Optional[MemoryTracker] = None,
+            eviction: typing.Optional[EvictionPolicy] = None,
+            executor: typing.Optional[concurrent.futures.Executor] = None,
+    ):
+        """
+        :param executor: runs factories of services declared with background=True in each new scope,
+            by default a thread pool per scope
+        """
+        # the prototype is only validated, its services are never created
+        self._prototype = Pytel.__new__(Pytel)
+        self._prototype._init_scope(parent, release_references, profiler, by_type, cache, memory, eviction)
+        self._prototype._configure(configurers, None, None)
+        self._executor = executor
+        self._compiled = CompiledGraph(self._prototype) if compiled else None
+        local = {id(descr): name for name, descr in self._prototype._objects.items()}
+        # dependencies of each service: name of a service of the template, or a descriptor of an ancestor
+        self._bindings: typing.Dict[str, typing.Dict[str, typing.Union[str, ObjectDescriptor]]] = {
+            name: {dep_name: local.get(id(dep), dep) for dep_name, dep in descr._resolved_deps.items()}
+            for name, descr in self._prototype._objects.items()
+        }
+
+    @property
+    def parent(self) -> typing.Optional[Pytel]:
+        return self._prototype._parent
+
+    def create(self) -> Pytel:
+        """
+        :return: a new context with its own instances, sharing instances of the parent
+        """
+        ctx = Pytel.__new__(Pytel)
+        prototype = self._prototype
+        ctx._init_scope(
+            prototype._parent,
+            prototype._release_references,
+            prototype._profiler,
+            prototype._by_type,
+            prototype._cache,
+            prototype._memory,
+            prototype._eviction,
+        )
+        objects = ctx._objects
+        objects.update((name, descr.copy()) for name, descr in self._prototype._objects.items())
+        ctx._order = self._prototype._order
+
+        bindings = self._bindings
+
+        def resolver(descr, name, _):
+            dep = bindings[descr.name][name]
+            return objects[dep] if isinstance(dep, str) else dep
+
+        ctx._bind(resolver)
+        if self._compiled is not None:
+            self._compiled.bind(ctx)
+        ctx._start_background(self._executor)
+        return ctx
+
+    def keys(self):
+        return self._prototype.keys()
+
+    def __len__(self):
+        return len(self._prototype)
+
+    def __contains__(self, item):
+        return item in self._prototype
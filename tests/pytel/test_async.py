@@ -0,0 +1,217 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import threading
+from unittest import TestCase
+
+from pytel import Pytel, service
+from .test_pytel import A, C
+
+
+class AsyncResource:
+    def __init__(self, log: list, name: str):
+        self.log = log
+        self.name = name
+
+    async def __aenter__(self):
+        self.log.append(f'enter {self.name}')
+        return self
+
+    async def __aexit__(self, *exc_details):
+        self.log.append(f'exit {self.name}')
+        return False
+
+
+class TestAsync(TestCase):
+    def test_async_factory(self):
+        async def factory() -> A:
+            await asyncio.sleep(0)
+            return A()
+
+        async def run():
+            async with Pytel({'a': factory, 'c': C}) as ctx:
+                c = await ctx.async_get('c')
+                self.assertIsInstance(c, C)
+                self.assertIs(ctx.a, c.a)
+
+        asyncio.run(run())
+
+    def test_async_factory_sync_access_raises(self):
+        async def factory() -> A:
+            return A()
+
+        ctx = Pytel({'a': factory})
+        self.assertRaises(TypeError, lambda: ctx.a)
+
+    def test_async_factory_returns_none(self):
+        async def factory() -> A:
+            return None
+
+        ctx = Pytel({'a': factory})
+        self.assertRaises(ValueError, lambda: asyncio.run(ctx.async_get('a')))
+
+    def test_independent_factories_run_concurrently(self):
+        started = []
+
+        def make(name):
+            async def factory() -> str:
+                started.append(name)
+                while len(started) < 2:
+                    await asyncio.sleep(0.001)
+                return name
+
+            return factory
+
+        async def run():
+            ctx = Pytel({'a': make('a'), 'b': make('b')})
+            await asyncio.wait_for(ctx.async_warm_up(), 5)
+            self.assertEqual('a', ctx.a)
+            self.assertEqual('b', ctx.b)
+
+        asyncio.run(run())
+
+    def test_async_context_managers_close_in_reverse_order(self):
+        log = []
+
+        def a() -> AsyncResource:
+            return AsyncResource(log, 'a')
+
+        @contextlib.contextmanager
+        def b(a: AsyncResource) -> str:
+            log.append('enter b')
+            yield 'b'
+            log.append('exit b')
+
+        def c(b: str) -> AsyncResource:
+            return AsyncResource(log, 'c')
+
+        async def run():
+            async with Pytel({'a': a, 'b': b, 'c': c}) as ctx:
+                await ctx.async_get('c')
+
+        asyncio.run(run())
+        self.assertEqual(['enter a', 'enter b', 'enter c', 'exit c', 'exit b', 'exit a'], log)
+
+    def test_aclose(self):
+        log = []
+
+        def a() -> AsyncResource:
+            return AsyncResource(log, 'a')
+
+        async def run():
+            ctx = Pytel({'a': a})
+            await ctx.async_warm_up()
+            await ctx.aclose()
+
+        asyncio.run(run())
+        self.assertEqual(['enter a', 'exit a'], log)
+
+    def test_failing_factory_cancels_others(self):
+        async def fails() -> int:
+            raise RuntimeError()
+
+        async def slow() -> str:
+            await asyncio.sleep(10)
+            return ''
+
+        ctx = Pytel({'a': fails, 'b': slow})
+        self.assertRaises(RuntimeError, lambda: asyncio.run(asyncio.wait_for(ctx.async_warm_up(), 5)))
+
+    def test_concurrent_resolution_creates_once(self):
+        log = []
+
+        async def a() -> AsyncResource:
+            await asyncio.sleep(0.01)
+            return AsyncResource(log, 'a')
+
+        async def run():
+            async with Pytel({'a': a}) as ctx:
+                first, second = await asyncio.gather(ctx.async_get('a'), ctx.async_get('a'))
+                self.assertIs(first, second)
+
+        asyncio.run(run())
+        self.assertEqual(['enter a', 'exit a'], log)
+
+    def test_concurrent_resolution_retries_after_failure(self):
+        calls = []
+
+        async def a() -> A:
+            calls.append(True)
+            await asyncio.sleep(0.01)
+            if len(calls) == 1:
+                raise RuntimeError()
+            return A()
+
+        async def run():
+            ctx = Pytel({'a': a})
+            failed = await asyncio.gather(ctx.async_get('a'), ctx.async_get('a'), return_exceptions=True)
+            return failed, await ctx.async_get('a')
+
+        (first, second), third = asyncio.run(run())
+        self.assertIsInstance(first, RuntimeError)
+        self.assertIs(first, second)
+        self.assertIsInstance(third, A)
+        self.assertEqual(2, len(calls))
+
+    def test_thread_waits_for_coroutine(self):
+        calls = []
+        started = threading.Event()
+
+        async def a() -> A:
+            calls.append(True)
+            started.set()
+            await asyncio.sleep(0.05)
+            return A()
+
+        ctx = Pytel({'a': a})
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            async def run():
+                task = asyncio.ensure_future(ctx.async_get('a'))
+                await asyncio.get_running_loop().run_in_executor(None, started.wait)
+                waiting = executor.submit(lambda: ctx.a)
+                return await task, await asyncio.wrap_future(waiting)
+
+            first, second = asyncio.run(run())
+        self.assertIs(first, second)
+        self.assertEqual(1, len(calls))
+
+    def test_sync_access_during_async_creation_raises(self):
+        started = None
+
+        async def a() -> A:
+            started.set()
+            await asyncio.sleep(0.01)
+            return A()
+
+        async def run():
+            nonlocal started
+            started = asyncio.Event()
+            ctx = Pytel({'a': a})
+            task = asyncio.ensure_future(ctx.async_get('a'))
+            await started.wait()
+            with self.assertRaises(RuntimeError):
+                ctx.a
+            return await task
+
+        self.assertIsInstance(asyncio.run(run()), A)
+
+    def test_scoped_service_with_async_dependency(self):
+        async def a() -> A:
+            await asyncio.sleep(0)
+            return A()
+
+        async def run():
+            ctx = Pytel({'a': a, 'c': service(C, scope='transient')})
+            first = await ctx.async_get('c')
+            second = await ctx.async_get('c')
+            self.assertIsNot(first, second)
+            self.assertIs(first.a, second.a)
+
+        asyncio.run(run())
+
+    def test_scoped_async_factory_rejected(self):
+        async def a() -> A:
+            return A()
+
+        with self.assertRaises(ValueError):
+            Pytel({'a': service(a, scope='transient')})
@@ -0,0 +1,158 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import threading
+import time
+from unittest import TestCase
+
+from pytel import Pytel, PytelTemplate, service
+from pytel.graph import run_in_background
+from .test_pytel import A, B, C
+
+
+class TestRunInBackground(TestCase):
+    def test_dependencies_first(self):
+        done = []
+        with concurrent.futures.ThreadPoolExecutor(4) as executor:
+            futures = run_in_background([1, 2, 3], lambda n: range(1, n), done.append, executor)
+            concurrent.futures.wait(futures.values())
+        self.assertEqual([1, 2, 3], done)
+
+    def test_failure_propagates_to_dependents(self):
+        error = RuntimeError()
+        called = []
+
+        def action(node):
+            called.append(node)
+            if node == 1:
+                raise error
+
+        with concurrent.futures.ThreadPoolExecutor(2) as executor:
+            futures = run_in_background([1, 2, 3], lambda n: [1] if n == 2 else [], action, executor)
+            concurrent.futures.wait(futures.values())
+        self.assertIs(error, futures[1].exception())
+        self.assertIs(error, futures[2].exception())
+        self.assertIsNone(futures[3].exception())
+        self.assertNotIn(2, called)
+
+
+class TestBackground(TestCase):
+    def test_started_on_construction(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def slow(a: A) -> C:
+            started.set()
+            release.wait()
+            return C(a)
+
+        ctx = Pytel({'a': A, 'c': service(slow, background=True), 'b': B})
+        self.assertTrue(started.wait(5))
+        self.assertIsInstance(ctx.b, B)
+        # dependencies are ready before the slow factory is called
+        self.assertIsInstance(ctx.a, A)
+        release.set()
+        self.assertIs(ctx.a, ctx.c.a)
+
+    def test_dependent_waits(self):
+        release = threading.Event()
+
+        def slow() -> A:
+            release.wait()
+            return A()
+
+        ctx = Pytel({'a': service(slow, background=True), 'c': C})
+        threading.Timer(0.05, release.set).start()
+        self.assertIs(ctx.a, ctx.c.a)
+
+    def test_failure_logged_and_retried_on_access(self):
+        calls = []
+
+        def flaky() -> A:
+            calls.append(True)
+            if len(calls) == 1:
+                raise KeyError('flaky')
+            return A()
+
+        with self.assertLogs('pytel', 'WARNING') as logs, concurrent.futures.ThreadPoolExecutor(1) as executor:
+            ctx = Pytel({'a': service(flaky, background=True), 'c': service(C, background=True)}, executor=executor)
+        self.assertEqual(1, len(logs.records))
+        self.assertIn('a', logs.output[0])
+        self.assertIs(ctx.a, ctx.c.a)
+        self.assertEqual(2, len(calls))
+
+    def test_close_waits_for_running_factory(self):
+        started = threading.Event()
+        log = []
+
+        @contextlib.contextmanager
+        def slow() -> A:
+            started.set()
+            time.sleep(0.05)
+            log.append('enter')
+            yield A()
+            log.append('exit')
+
+        ctx = Pytel({'a': service(slow, background=True)})
+        self.assertTrue(started.wait(5))
+        ctx.close()
+        self.assertEqual(['enter', 'exit'], log)
+
+    def test_close_cancels_pending_factories(self):
+        release = threading.Event()
+        created = []
+
+        def slow() -> A:
+            release.wait()
+            return A()
+
+        def dependent(a: A) -> C:
+            created.append(True)
+            return C(a)
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            ctx = Pytel({'a': service(slow, background=True), 'c': service(dependent, background=True)},
+                        executor=executor)
+            threading.Timer(0.05, release.set).start()
+            ctx.close()
+        self.assertEqual([], created)
+
+    def test_created_once(self):
+        created = []
+
+        def factory() -> A:
+            created.append(True)
+            return A()
+
+        ctx = Pytel({'a': service(factory, background=True), 'c': service(C, background=True)})
+        ctx.c, ctx.a
+        ctx.warm_up()
+        self.assertEqual([True], created)
+
+    def test_executor(self):
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            ctx = Pytel({'a': service(A, background=True)}, executor=executor)
+            self.assertIsInstance(ctx.a, A)
+
+    def test_async(self):
+        ctx = Pytel({'a': service(A, background=True), 'c': C})
+        c = asyncio.run(ctx.async_get('c'))
+        self.assertIs(ctx.a, c.a)
+
+    def test_singletons_only(self):
+        self.assertRaises(ValueError, lambda: service(A, background=True, scope='transient'))
+
+    def test_template(self):
+        created = []
+
+        def factory() -> A:
+            created.append(threading.current_thread())
+            return A()
+
+        with concurrent.futures.ThreadPoolExecutor(1) as executor:
+            template = PytelTemplate({'a': service(factory, background=True)}, executor=executor)
+            self.assertEqual([], created)
+            first, second = template.create(), template.create()
+            self.assertIsNot(first.a, second.a)
+        self.assertEqual(2, len(created))
+        self.assertNotIn(threading.current_thread(), created)
@@ -0,0 +1,124 @@
+import contextlib
+from unittest import TestCase
+
+from pytel import Pytel, PytelTemplate, SharedCache, service
+from .test_pytel import A, B, C
+
+
+class TestSharedCache(TestCase):
+    def test_shared_between_contexts(self):
+        cache = SharedCache()
+        first = Pytel({'b': service(B, shared=True)}, cache=cache)
+        second = Pytel({'b': service(B, shared=True)}, cache=cache)
+        self.assertIs(first.b, second.b)
+        self.assertEqual((1, 1), cache.cache_info()[:2])
+
+    def test_not_shared_by_default(self):
+        cache = SharedCache()
+        self.assertIsNot(Pytel({'b': B}, cache=cache).b, Pytel({'b': B}, cache=cache).b)
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_keyed_by_dependencies(self):
+        cache = SharedCache()
+        a = A()
+        first = Pytel({'a': a, 'c': service(C, shared=True)}, cache=cache)
+        same = Pytel({'a': a, 'c': service(C, shared=True)}, cache=cache)
+        other = Pytel({'a': A(), 'c': service(C, shared=True)}, cache=cache)
+        self.assertIs(first.c, same.c)
+        self.assertIsNot(first.c, other.c)
+
+    def test_shared_dependencies_chain(self):
+        cache = SharedCache()
+        configuration = {'a': service(A, shared=True), 'c': service(C, shared=True)}
+        self.assertIs(Pytel(configuration, cache=cache).c, Pytel(configuration, cache=cache).c)
+
+    def test_context_manager_closed_on_eviction(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> B:
+            yield B()
+            closed.append(True)
+
+        cache = SharedCache(maxsize=0)
+        with Pytel({'b': service(factory, shared=True)}, cache=cache) as first:
+            with Pytel({'b': service(factory, shared=True)}, cache=cache) as second:
+                self.assertIs(first.b, second.b)
+            self.assertEqual([], closed)
+        self.assertEqual([True], closed)
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_lru_eviction_of_unused(self):
+        def a() -> A:
+            return A()
+
+        def b() -> B:
+            return B()
+
+        cache = SharedCache(maxsize=1)
+        first = service(a, shared=True)
+        with Pytel({'a': first}, cache=cache) as ctx:
+            a = ctx.a
+        with Pytel({'a': first}, cache=cache) as ctx:
+            self.assertIs(a, ctx.a)
+        with Pytel({'b': service(b, shared=True)}, cache=cache) as ctx:
+            ctx.b
+        self.assertIsNot(a, Pytel({'a': first}, cache=cache).a)
+
+    def test_clear_keeps_used(self):
+        cache = SharedCache()
+        ctx = Pytel({'b': service(B, shared=True)}, cache=cache)
+        b = ctx.b
+        with Pytel({'a': service(A, shared=True)}, cache=cache) as other:
+            other.a
+        cache.cache_clear()
+        self.assertEqual(1, cache.cache_info().currsize)
+        self.assertIs(b, Pytel({'b': service(B, shared=True)}, cache=cache).b)
+
+    def test_errors_not_cached(self):
+        calls = []
+
+        def factory() -> B:
+            calls.append(True)
+            if len(calls) == 1:
+                raise RuntimeError()
+            return B()
+
+        cache = SharedCache()
+        self.assertRaises(RuntimeError, lambda: Pytel({'b': service(factory, shared=True)}, cache=cache).b)
+        self.assertEqual(0, cache.cache_info().currsize)
+        self.assertIsInstance(Pytel({'b': service(factory, shared=True)}, cache=cache).b, B)
+
+    def test_template(self):
+        cache = SharedCache()
+        template = PytelTemplate({'b': service(B, shared=True)}, cache=cache, compiled=True)
+        self.assertIs(template.create().b, template.create().b)
+
+    def test_replace_releases(self):
+        cache = SharedCache(maxsize=0)
+        ctx = Pytel({'b': service(B, shared=True)}, cache=cache)
+        ctx.b
+        ctx.replace('b', B)
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_cache_required(self):
+        self.assertRaises(ValueError, lambda: Pytel({'b': service(B, shared=True)}))
+
+    def test_close(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> B:
+            yield B()
+            closed.append(True)
+
+        cache = SharedCache()
+        with Pytel({'b': service(factory, shared=True)}, cache=cache) as ctx:
+            ctx.b
+        self.assertEqual([], closed)
+        cache.close()
+        self.assertEqual([True], closed)
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_singletons_only(self):
+        self.assertRaises(ValueError, lambda: service(B, shared=True, scope='thread'))
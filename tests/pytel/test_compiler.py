@@ -0,0 +1,76 @@
+import contextlib
+import weakref
+from unittest import TestCase
+
+from pytel import Profiler, Pytel, PytelTemplate
+from .test_pytel import A, B, C, E
+
+
+class TestCompiledGraph(TestCase):
+    def test_compiled_resolution(self):
+        ctx = Pytel({'a': A, 'b': B, 'c': C, 'e': E})
+        ctx.compile()
+        self.assertIsNotNone(ctx._objects['e']._compiled)
+        self.assertIsInstance(ctx.e, E)
+        self.assertIs(ctx.a, ctx.e.c.a)
+        self.assertIs(ctx.b, ctx.e.b)
+
+    def test_compiled_resolution_from_parent(self):
+        parent = Pytel({'a': A})
+        ctx = Pytel({'c': C}, parent=parent)
+        compiled = ctx.compile()
+        self.assertIn('x0.instance', compiled.source)
+        self.assertIs(parent.a, ctx.c.a)
+
+    def test_values_are_not_compiled(self):
+        a = A()
+        ctx = Pytel({'a': a, 'c': C})
+        ctx.compile()
+        self.assertIsNone(ctx._objects['a']._compiled)
+        self.assertIs(a, ctx.c.a)
+
+    def test_compiled_factory_returns_none(self):
+        def factory() -> A:
+            return None
+
+        ctx = Pytel({'a': factory})
+        ctx.compile()
+        self.assertRaises(ValueError, lambda: ctx.a)
+
+    def test_compiled_context_manager(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> B:
+            yield B()
+            closed.append(True)
+
+        with Pytel({'b': factory}) as ctx:
+            ctx.compile()
+            ctx.b
+        self.assertEqual([True], closed)
+
+    def test_factories_released(self):
+        def factory() -> A:
+            return A()
+
+        ref = weakref.ref(factory)
+        ctx = Pytel({'a': factory, 'c': C}, release_references=True)
+        del factory
+        ctx.compile()
+        ctx.c
+        self.assertIsNone(ref())
+
+    def test_profiler(self):
+        ctx = Pytel({'a': A}, profiler=Profiler())
+        self.assertRaises(ValueError, ctx.compile)
+
+    def test_compiled_template(self):
+        parent = Pytel({'a': A})
+        template = PytelTemplate({'b': B, 'c': C, 'e': E}, parent, compiled=True)
+        first = template.create()
+        second = template.create()
+        self.assertIsNotNone(first._objects['e']._compiled)
+        self.assertIsNot(first.e, second.e)
+        self.assertIs(first.b, first.e.b)
+        self.assertIs(parent.a, second.e.c.a)
@@ -0,0 +1,145 @@
+import contextlib
+from unittest import TestCase
+from unittest.mock import patch
+
+from pytel import Pytel, configurer, service
+from pytel.context import ObjectDescriptor, is_async_context_manager, is_context_manager, services_from_object
+from pytel.introspection import signature_cache
+from .test_pytel import A, B, C
+
+
+class TestConfigurer(TestCase):
+    def test_registers_class_body(self):
+        evaluated = []
+
+        @configurer
+        class Configurer:
+            b = B
+
+            def a(self) -> A:
+                return A()
+
+            def c(self, a: A) -> C:
+                return C(a)
+
+            @service(lazy=True)
+            def lazy_a(self) -> A:
+                return A()
+
+            @staticmethod
+            def static() -> B:
+                return B()
+
+            @classmethod
+            def from_class(cls) -> B:
+                return B()
+
+            @property
+            def expensive(self) -> A:
+                evaluated.append(True)
+                return A()
+
+            def _helper(self) -> A:
+                return A()
+
+        self.assertEqual(('b', 'a', 'c', 'lazy_a', 'static', 'from_class'), Configurer.__pytel_services__)
+        ctx = Pytel(Configurer())
+        self.assertIs(ctx.a, ctx.c.a)
+        self.assertIsInstance(ctx.static, B)
+        self.assertIsInstance(ctx.from_class, B)
+        self.assertTrue(ctx._objects['lazy_a']._options.lazy)
+        self.assertNotIn('expensive', ctx)
+        self.assertEqual([], evaluated)
+
+    def test_signatures_introspected_on_definition(self):
+        @configurer
+        class Configurer:
+            def c(self, a: A) -> C:
+                return C(a)
+
+            @classmethod
+            def b(cls) -> B:
+                return B()
+
+        with patch('pytel.context.introspect') as introspect:
+            self.assertEqual({'a': A}, ObjectDescriptor.from_('c', Configurer().c).dependencies)
+            self.assertIs(B, ObjectDescriptor.from_('b', Configurer().b).object_type)
+            introspect.assert_not_called()
+
+    def test_invalid_factory_fails_on_definition(self):
+        def define():
+            @configurer
+            class Configurer:
+                def a(self):
+                    return A()
+
+        self.assertRaises(TypeError, define)
+
+    def test_inherits_registered_bases(self):
+        @configurer
+        class Base:
+            def a(self) -> A:
+                return A()
+
+            def b(self) -> B:
+                return B()
+
+        @configurer
+        class Derived(Base):
+            def c(self, a: A) -> C:
+                return C(a)
+
+            b = property(lambda self: B())
+
+        self.assertEqual({'a', 'c'}, set(services_from_object(Derived())))
+
+    def test_undecorated_subclass_scans(self):
+        @configurer
+        class Base:
+            def a(self) -> A:
+                return A()
+
+        class Derived(Base):
+            def b(self) -> B:
+                return B()
+
+        self.assertEqual({'a', 'b'}, set(services_from_object(Derived())))
+
+    def test_signature_cache_still_used(self):
+        @configurer
+        class Configurer:
+            def a(self) -> A:
+                return A()
+
+        signature_cache.cache_clear()
+        self.assertIs(A, ObjectDescriptor.from_('a', Configurer().a).object_type)
+
+
+class TestProtocols(TestCase):
+    def test_type_level(self):
+        class Manager:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *args):
+                pass
+
+        class AsyncManager:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                pass
+
+        manager = Manager()
+        self.assertTrue(is_context_manager(manager))
+        self.assertFalse(is_async_context_manager(manager))
+        self.assertTrue(is_async_context_manager(AsyncManager()))
+        self.assertTrue(is_context_manager(contextlib.ExitStack()))
+        self.assertFalse(is_context_manager(A()))
+
+    def test_instance_attributes_ignored(self):
+        a = A()
+        a.__enter__ = lambda: a
+        a.__exit__ = lambda *args: None
+        self.assertFalse(is_context_manager(a))
@@ -0,0 +1,147 @@
+import contextlib
+from unittest import TestCase
+
+from pytel import EvictionPolicy, Pytel, PytelTemplate, service
+from pytel.lazy import LazyProxy
+from .test_pytel import A, B, C
+
+
+def closing(closed):
+    @contextlib.contextmanager
+    def factory() -> A:
+        a = A()
+        yield a
+        closed.append(a)
+
+    return factory
+
+
+class TestEviction(TestCase):
+    def test_kept_without_budget(self):
+        closed = []
+        with Pytel({'a': service(closing(closed), scope='evictable')}) as ctx:
+            a = ctx.a
+            self.assertIs(a, ctx.a)
+            self.assertEqual([], closed)
+        self.assertEqual([a], closed)
+
+    def test_lru_eviction_closes_and_recreates(self):
+        closed = []
+        policy = EvictionPolicy(max_instances=1)
+        with Pytel({
+            'a': service(closing(closed), scope='evictable'),
+            'b': service(B, scope='evictable'),
+        }, eviction=policy) as ctx:
+            a = ctx.a
+            ctx.b
+            self.assertEqual([a], closed)
+            self.assertEqual((1, 0, 1), policy.info())
+            second = ctx.a
+            self.assertIsNot(a, second)
+        self.assertEqual([a, second], closed)
+        self.assertEqual(0, policy.info().instances)
+
+    def test_least_recently_used_first(self):
+        policy = EvictionPolicy(max_instances=2)
+        ctx = Pytel({
+            'a': service(A, scope='evictable'),
+            'b': service(B, scope='evictable'),
+            'c': service(make_c, scope='evictable'),
+        }, eviction=policy)
+        a, b = ctx.a, ctx.b
+        self.assertIs(a, ctx.a)
+        ctx.c
+        self.assertIs(a, ctx.a)
+        self.assertIsNot(b, ctx.b)
+
+    def test_dependents_receive_proxy(self):
+        policy = EvictionPolicy(max_instances=1)
+        ctx = Pytel({'a': service(A, scope='evictable'), 'b': service(B, scope='evictable'), 'c': C}, eviction=policy)
+        c = ctx.c
+        self.assertIsInstance(object.__getattribute__(c, 'a'), LazyProxy)
+        first = ctx.a
+        self.assertTrue(c.a == first)
+        ctx.b
+        self.assertFalse(c.a == first)
+        self.assertTrue(c.a == ctx.a)
+
+    def test_acquire_pins(self):
+        closed = []
+        policy = EvictionPolicy(max_instances=1)
+        with Pytel({
+            'a': service(closing(closed), scope='evictable'),
+            'b': service(B, scope='evictable'),
+        }, eviction=policy) as ctx:
+            with ctx.acquire('a') as a:
+                ctx.b
+                self.assertEqual(2, policy.info().instances)
+                self.assertEqual([], closed)
+            # the budget applies again once released, evicting the least recently used
+            self.assertEqual(1, policy.info().instances)
+            self.assertIs(a, ctx.a)
+            self.assertEqual([], closed)
+
+    def test_memory_budget(self):
+        policy = EvictionPolicy(max_bytes=100, sizeof=lambda instance: 60)
+        ctx = Pytel({'a': service(A, scope='evictable'), 'b': service(B, scope='evictable')}, eviction=policy)
+        a = ctx.a
+        self.assertEqual((1, 60, 0), policy.info())
+        ctx.b
+        self.assertEqual((1, 60, 1), policy.info())
+        self.assertIsNot(a, ctx.a)
+
+    def test_memory_budget_needs_sizeof(self):
+        self.assertRaises(ValueError, EvictionPolicy, max_bytes=100)
+
+    def test_over_budget_instance_kept_until_next(self):
+        policy = EvictionPolicy(max_bytes=10, sizeof=lambda instance: 60)
+        ctx = Pytel({'a': service(A, scope='evictable')}, eviction=policy)
+        a = ctx.a
+        self.assertEqual(1, policy.info().instances)
+        policy.collect()
+        self.assertIsNot(a, ctx.a)
+
+    def test_max_idle(self):
+        policy = EvictionPolicy(max_idle=0)
+        ctx = Pytel({'a': service(A, scope='evictable')}, eviction=policy)
+        a = ctx.a
+        policy.collect()
+        self.assertEqual(0, policy.info().instances)
+        self.assertIsNot(a, ctx.a)
+
+    def test_evict_idle(self):
+        closed = []
+        policy = EvictionPolicy()
+        ctx = Pytel({'a': service(closing(closed), scope='evictable')}, eviction=policy)
+        a = ctx.a
+        policy.evict_idle()
+        self.assertEqual([a], closed)
+        ctx.close()
+        self.assertEqual([a], closed)
+
+    def test_shared_by_contexts(self):
+        policy = EvictionPolicy(max_instances=1)
+        template = PytelTemplate({'a': service(A, scope='evictable')}, eviction=policy)
+        first, second = template.create(), template.create()
+        a = first.a
+        self.assertIsNot(a, second.a)
+        self.assertIsNot(a, first.a)
+
+    def test_failed_factory(self):
+        def fail() -> A:
+            raise RuntimeError()
+
+        policy = EvictionPolicy()
+        ctx = Pytel({'a': service(fail, scope='evictable')}, eviction=policy)
+        self.assertRaises(RuntimeError, lambda: ctx.a)
+        self.assertEqual(0, policy.info().instances)
+
+    def test_acquire_other_scopes(self):
+        ctx = Pytel({'a': A})
+        with self.assertRaises(TypeError):
+            with ctx.acquire('a'):
+                pass
+
+
+def make_c() -> C:
+    return C(A())
@@ -0,0 +1,156 @@
+import contextlib
+import inspect
+import os
+import pickle
+import threading
+import unittest
+from unittest import TestCase
+
+from pytel import Pytel, service
+from .test_pytel import A, B, C, D
+
+
+def in_child(action):
+    """
+    Run the action in a forked process and return its result.
+    """
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read)
+            try:
+                result = ('ok', action())
+            except Exception as e:
+                result = ('error', repr(e))
+            with os.fdopen(write, 'wb') as f:
+                pickle.dump(result, f)
+        finally:
+            os._exit(0)
+    os.close(write)
+    with os.fdopen(read, 'rb') as f:
+        result = pickle.load(f)
+    os.waitpid(pid, 0)
+    return result
+
+
+@unittest.skipUnless(hasattr(os, 'register_at_fork'), 'requires os.fork')
+class TestFork(TestCase):
+    def test_reinit_rebuilds_dependents_only(self):
+        created = []
+
+        def a() -> A:
+            created.append('a')
+            return A()
+
+        def b() -> B:
+            created.append('b')
+            return B()
+
+        def c(a: A) -> C:
+            created.append('c')
+            return C(a)
+
+        def d(c: C) -> D:
+            created.append('d')
+            return D(c)
+
+        ctx = Pytel({'a': service(a, fork='reinit'), 'b': b, 'c': c, 'd': d})
+        ctx.d, ctx.b
+        self.assertEqual(['a', 'c', 'd', 'b'], created)
+
+        def use():
+            del created[:]
+            ctx.d, ctx.b
+            return created, ctx.d.c.a is ctx.a
+
+        self.assertEqual(('ok', (['a', 'c', 'd'], True)), in_child(use))
+        self.assertEqual(['a', 'c', 'd', 'b'], created)
+
+    def test_child_does_not_close_parent_resources(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> A:
+            yield A()
+            closed.append(os.getpid())
+
+        ctx = Pytel({'a': service(factory, fork='reinit')})
+        ctx.a
+
+        def close():
+            ctx.close()
+            return len(closed)
+
+        self.assertEqual(('ok', 0), in_child(close))
+        ctx.close()
+        self.assertEqual([os.getpid()], closed)
+
+    def test_forbid(self):
+        ctx = Pytel({'a': service(A, fork='forbid'), 'c': C})
+        ctx.c
+        status, error = in_child(lambda: ctx.c)
+        self.assertEqual('error', status)
+        self.assertIn('before fork', error)
+
+    def test_forbid_not_created(self):
+        ctx = Pytel({'a': service(A, fork='forbid')})
+        self.assertEqual('ok', in_child(lambda: ctx.a)[0])
+
+    def test_share_by_default(self):
+        ctx = Pytel({'a': A})
+        a = id(ctx.a)
+        self.assertEqual(('ok', a), in_child(lambda: id(ctx.a)))
+
+    def test_dependents_in_child_context(self):
+        parent = Pytel({'a': service(A, fork='reinit')})
+        child = Pytel({'c': C}, parent)
+        a = child.c.a
+        self.assertEqual(('ok', (False, True)), in_child(lambda: (child.c.a is a, child.c.a is parent.a)))
+
+    def test_unknown_policy(self):
+        self.assertRaises(ValueError, lambda: service(A, fork='copy'))
+
+    def test_forbid_through_child_attribute(self):
+        parent = Pytel({'a': service(A, fork='forbid')})
+        child = Pytel({}, parent)
+        child.a
+        status, error = in_child(lambda: child.a)
+        self.assertEqual('error', status)
+        self.assertIn('before fork', error)
+
+    def test_reinit_through_child_attribute(self):
+        parent = Pytel({'a': service(A, fork='reinit')})
+        child = Pytel({}, parent)
+        a = child.a
+        self.assertEqual(('ok', (False, True)), in_child(lambda: (child.a is a, child.a is parent.a)))
+
+    def test_release_references_rejected(self):
+        self.assertRaises(ValueError, Pytel, {'a': service(A, fork='reinit')}, release_references=True)
+        parent = Pytel({'a': service(A, fork='forbid')})
+        self.assertRaises(ValueError, Pytel, {'c': C}, parent, release_references=True)
+        Pytel({'b': B}, parent, release_references=True)
+
+    def test_deferred_lock_held_by_other_thread(self):
+        # another thread is building a deferred service at the time of fork
+        locked, done = threading.Event(), threading.Event()
+
+        class Slow:
+            @property
+            def __signature__(self):
+                locked.set()
+                done.wait()
+                return inspect.Signature(return_annotation=B)
+
+            def __call__(self) -> B:
+                return B()
+
+        ctx = Pytel({'a': A, 'b': Slow(), 'c': C}, roots=[])
+        thread = threading.Thread(target=lambda: ctx.b)
+        thread.start()
+        locked.wait()
+        try:
+            self.assertEqual(('ok', True), in_child(lambda: ctx.c.a is ctx.a))
+        finally:
+            done.set()
+            thread.join()
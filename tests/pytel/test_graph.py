@@ -0,0 +1,55 @@
+from unittest import TestCase
+
+from pytel import Pytel
+from pytel.graph import topological_order
+
+
+def chain(length: int) -> dict:
+    def first() -> int:
+        return 0
+
+    result = {'s0': first}
+    for i in range(1, length):
+        result[f's{i}'] = _link(f's{i - 1}')
+    return result
+
+
+def _link(dep_name: str):
+    ns = {}
+    exec(f'def factory({dep_name}: int) -> int:\n    return {dep_name} + 1', ns)
+    return ns['factory']
+
+
+class TestTopologicalOrder(TestCase):
+    def test_dependencies_first(self):
+        edges = {'a': ['b', 'c'], 'b': ['c'], 'c': []}
+        self.assertEqual(['c', 'b', 'a'], topological_order(['a'], edges.__getitem__))
+
+    def test_shared_dependency_visited_once(self):
+        edges = {'a': ['c'], 'b': ['c'], 'c': []}
+        self.assertEqual(['c', 'a', 'b'], topological_order(['a', 'b', 'c'], edges.__getitem__))
+
+    def test_cycle_raises(self):
+        edges = {'a': ['b'], 'b': ['a']}
+        with self.assertRaises(ValueError) as e:
+            topological_order(['a'], edges.__getitem__)
+        self.assertIn("['a', 'b', 'a']", str(e.exception))
+
+    def test_deep_chain(self):
+        depth = 50000
+        edges = lambda n: [n + 1] if n < depth else []
+        order = topological_order([0], edges)
+        self.assertEqual(depth + 1, len(order))
+        self.assertEqual(depth, order[0])
+
+
+class TestDeepGraph(TestCase):
+    def test_deep_chain_check_and_resolve(self):
+        length = 5000
+        ctx = Pytel(chain(length))
+        self.assertEqual(length - 1, getattr(ctx, f's{length - 1}'))
+
+    def test_deep_cycle_raises(self):
+        svc = chain(3000)
+        svc['s0'] = _link('s2999')
+        self.assertRaises(ValueError, lambda: Pytel(svc))
@@ -0,0 +1,96 @@
+import gc
+from unittest import TestCase
+
+from pytel.context import ObjectDescriptor
+from pytel.introspection import CacheInfo, IntrospectionCache, signature_cache
+from .test_pytel import A, C
+
+
+class TestIntrospectionCache(TestCase):
+    def test_hit_and_miss(self):
+        cache = IntrospectionCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return 'value'
+
+        self.assertEqual('value', cache.get(A, compute))
+        self.assertEqual('value', cache.get(A, compute))
+        self.assertEqual(1, len(calls))
+        info = cache.cache_info()
+        self.assertEqual((1, 1, 1), (info.hits, info.misses, info.currsize))
+
+    def test_bounded(self):
+        cache = IntrospectionCache(maxsize=1)
+        cache.get(A, lambda: 'a')
+        cache.get(C, lambda: 'c')
+        self.assertEqual(1, cache.cache_info().currsize)
+        self.assertEqual('a2', cache.get(A, lambda: 'a2'))
+
+    def test_weak_keys(self):
+        cache = IntrospectionCache()
+
+        def factory() -> A:
+            pass
+
+        cache.get(factory, lambda: 'value')
+        del factory
+        gc.collect()
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_collected_while_locked(self):
+        cache = IntrospectionCache()
+
+        class Factory:
+            pass
+
+        cache.get(Factory, lambda: 'value')
+        del Factory
+        # the callback of the reference may run while the cache holds its lock
+        with cache._lock:
+            gc.collect()
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_bound_methods_share_entry(self):
+        class Configurer:
+            def a(self) -> A:
+                pass
+
+        cache = IntrospectionCache()
+        cache.get(Configurer().a, lambda: 'method')
+        self.assertEqual('method', cache.get(Configurer().a, lambda: 'other'))
+        self.assertEqual('function', cache.get(Configurer.a, lambda: 'function'))
+
+    def test_not_weakly_referable(self):
+        cache = IntrospectionCache()
+        self.assertEqual('value', cache.get(''.capitalize, lambda: 'value'))
+        self.assertEqual(0, cache.cache_info().currsize)
+
+    def test_clear(self):
+        cache = IntrospectionCache()
+        cache.get(A, lambda: 'value')
+        cache.cache_clear()
+        self.assertEqual(CacheInfo(0, 0, 4096, 0), cache.cache_info())
+
+
+class TestSignatureCache(TestCase):
+    def test_from_callable_uses_cache(self):
+        def factory(a: A) -> C:
+            pass
+
+        signature_cache.cache_clear()
+        first = ObjectDescriptor.from_callable('c', factory)
+        second = ObjectDescriptor.from_callable('c', factory)
+        self.assertEqual(first, second)
+        self.assertEqual(1, signature_cache.cache_info().hits)
+        self.assertIsNot(first.dependencies, second.dependencies)
+
+    def test_errors_are_not_cached(self):
+        def factory():
+            pass
+
+        signature_cache.cache_clear()
+        self.assertRaises(TypeError, lambda: ObjectDescriptor.from_callable('a', factory))
+        self.assertRaises(TypeError, lambda: ObjectDescriptor.from_callable('a', factory))
+        self.assertEqual(0, signature_cache.cache_info().currsize)
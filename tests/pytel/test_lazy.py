@@ -0,0 +1,106 @@
+from unittest import TestCase
+
+from pytel import Lazy, LazyProxy, Pytel, service
+from .test_pytel import A, B
+
+
+class Model:
+    def __init__(self):
+        self.weights = [1, 2, 3]
+
+    def predict(self) -> int:
+        return sum(self.weights)
+
+
+class UsesModel:
+    def __init__(self, model: Lazy[Model]):
+        self.model = model
+
+
+class UsesModelEagerly:
+    def __init__(self, model: Model):
+        self.model = model
+
+
+class TestLazy(TestCase):
+    def test_lazy_dependency_is_proxy(self):
+        created = []
+
+        def model() -> Model:
+            created.append(1)
+            return Model()
+
+        ctx = Pytel({'model': model, 'user': UsesModel})
+        user = ctx.user
+        self.assertEqual([], created)
+        self.assertIs(LazyProxy, type(user.model))
+        self.assertEqual(6, user.model.predict())
+        self.assertEqual([1], created)
+        self.assertIs(ctx.model, user.model._pytel_get())
+
+    def test_proxy_is_transparent(self):
+        ctx = Pytel({'model': Model, 'user': UsesModel})
+        proxy = ctx.user.model
+        self.assertIsInstance(proxy, Model)
+        self.assertEqual([1, 2, 3], list(proxy.weights))
+        proxy.weights = [4]
+        self.assertEqual([4], ctx.model.weights)
+        self.assertEqual(repr(ctx.model), repr(proxy))
+        self.assertTrue(proxy == ctx.model)
+
+    def test_proxy_forwards_operators(self):
+        ctx = Pytel({'items': list_factory, 'user': UsesList})
+        items = ctx.user.items
+        self.assertEqual(3, len(items))
+        self.assertEqual(2, items[1])
+        self.assertIn(3, items)
+        self.assertEqual([1, 2, 3], list(items))
+
+    def test_resolved_dependency_is_injected_directly(self):
+        ctx = Pytel({'model': Model, 'user': UsesModel})
+        model = ctx.model
+        self.assertIs(model, ctx.user.model)
+
+    def test_lazy_dependency_type_checked(self):
+        self.assertRaises(ValueError, lambda: Pytel({'model': A, 'user': UsesModel}))
+
+    def test_lazy_service(self):
+        created = []
+
+        def model() -> Model:
+            created.append(1)
+            return Model()
+
+        ctx = Pytel({'model': service(model, lazy=True), 'user': UsesModelEagerly})
+        ctx.warm_up()
+        self.assertEqual([], created)
+        self.assertEqual(6, ctx.user.model.predict())
+        self.assertEqual([1], created)
+
+    def test_lazy_service_method(self):
+        class Configurer:
+            @service(lazy=True)
+            def model(self) -> Model:
+                return Model()
+
+            def user(self, model: Model) -> UsesModelEagerly:
+                return UsesModelEagerly(model)
+
+        ctx = Pytel(Configurer())
+        self.assertIs(LazyProxy, type(ctx.user.model))
+        self.assertIsInstance(ctx.model, Model)
+
+    def test_lazy_compiled(self):
+        ctx = Pytel({'model': Model, 'user': UsesModel, 'b': B})
+        ctx.compile()
+        self.assertIs(LazyProxy, type(ctx.user.model))
+        self.assertEqual(6, ctx.user.model.predict())
+
+
+def list_factory() -> list:
+    return [1, 2, 3]
+
+
+class UsesList:
+    def __init__(self, items: Lazy[list]):
+        self.items = items
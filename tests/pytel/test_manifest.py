@@ -0,0 +1,108 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import patch
+
+from pytel import Lazy, Pytel, service
+from .test_pytel import A, B, C
+
+
+class Configurer:
+    b = B
+
+    def c(self, a: A) -> C:
+        return C(a)
+
+    def lazy_c(self, a: Lazy[A]) -> C:
+        return C(a)
+
+    @service(lazy=True)
+    def d(self) -> B:
+        return B()
+
+
+class TestManifest(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'manifest.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, parent=None):
+        return Pytel([{'a': A}, Configurer()], parent=parent, manifest=self.path)
+
+    def test_writes_manifest(self):
+        self.build()
+        with open(self.path) as f:
+            manifest = json.load(f)
+        self.assertEqual(['a', 'b', 'c', 'd', 'lazy_c'], sorted(entry['name'] for entry in manifest['services']))
+        self.assertIn(__name__, manifest['modules'])
+        self.assertEqual({'a': f'{A.__module__}:A'}, next(
+            entry['dependencies'] for entry in manifest['services'] if entry['name'] == 'c'))
+
+    def test_loads_without_introspection_and_checks(self):
+        first = self.build()
+        with patch('pytel.pytel.Pytel._check') as check, \
+                patch('pytel.context.ObjectDescriptor.from_callable') as from_callable, \
+                patch('pytel.pytel.to_factory_map') as to_factory_map:
+            ctx = self.build()
+            check.assert_not_called()
+            from_callable.assert_not_called()
+            to_factory_map.assert_not_called()
+        self.assertEqual(
+            {name: (descr.object_type, descr.dependencies) for name, descr in first.items()},
+            {name: (descr.object_type, descr.dependencies) for name, descr in ctx.items()})
+        self.assertEqual(first._order, ctx._order)
+        self.assertIsInstance(ctx.c, C)
+        self.assertIs(ctx.a, ctx.c.a)
+        self.assertEqual(frozenset(['a']), ctx._objects['lazy_c']._lazy_deps)
+        self.assertTrue(ctx._objects['d']._options.lazy)
+
+    def test_out_of_date_manifest_is_rewritten(self):
+        self.build()
+        with open(self.path) as f:
+            manifest = json.load(f)
+        manifest['fingerprint'] = 'stale'
+        with open(self.path, 'w') as f:
+            json.dump(manifest, f)
+
+        with patch('pytel.pytel.Pytel._check') as check:
+            self.build()
+            check.assert_called_once()
+        with open(self.path) as f:
+            self.assertNotEqual('stale', json.load(f)['fingerprint'])
+
+    def test_parent_types_are_checked(self):
+        Pytel({'c': C}, parent=Pytel({'a': A}), manifest=self.path)
+        self.assertRaises(ValueError, lambda: Pytel({'c': C}, parent=Pytel({'a': B}), manifest=self.path))
+
+    def test_local_types_are_not_persisted(self):
+        class Local:
+            pass
+
+        with patch('pytel.pytel.log') as log:
+            ctx = Pytel({'local': Local}, manifest=self.path)
+            log.warning.assert_called_once()
+        self.assertIsInstance(ctx.local, Local)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_added_service_invalidates(self):
+        Pytel({'a': A}, manifest=self.path)
+        ctx = Pytel({'a': A, 'b': B}, manifest=self.path)
+        self.assertIn('b', ctx)
+        self.assertIsInstance(ctx.b, B)
+
+    def test_changed_factory_invalidates(self):
+        def make_a() -> A:
+            return A()
+
+        def make_c(a: A) -> C:
+            return C(a)
+
+        Pytel({'a': make_a, 'c': make_a}, manifest=self.path)
+        with patch('pytel.pytel.Pytel._check') as check:
+            Pytel({'a': make_a, 'c': make_c}, manifest=self.path)
+            check.assert_called_once()
+        self.assertEqual({'a': A}, Pytel({'a': make_a, 'c': make_c}, manifest=self.path)._objects['c'].dependencies)
@@ -0,0 +1,93 @@
+import tracemalloc
+from unittest import TestCase
+
+from pytel import Lazy, MemoryTracker, Pytel, PytelTemplate, service
+from .test_pytel import A, B
+
+
+class Heavy:
+    def __init__(self):
+        self.data = [bytearray(1000) for _ in range(1000)]
+
+
+class Holder:
+    def __init__(self, heavy: Heavy):
+        self.heavy = heavy
+        self.small = bytearray(100)
+
+
+class LazyHolder:
+    def __init__(self, heavy: Lazy[Heavy]):
+        self.heavy = heavy
+        self.size = len(heavy.data)
+
+
+class TestMemoryTracker(TestCase):
+    def tracker(self) -> MemoryTracker:
+        memory = MemoryTracker()
+        self.addCleanup(memory.close)
+        return memory
+
+    def test_dependencies_charged_separately(self):
+        memory = self.tracker()
+        ctx = Pytel({'heavy': Heavy, 'holder': Holder}, memory=memory)
+        ctx.holder
+        usage = memory.usage()
+        self.assertGreater(usage['heavy'].size, 1000 * 1000)
+        self.assertEqual(1, usage['heavy'].calls)
+        self.assertLess(usage['holder'].size, usage['heavy'].size / 10)
+        inclusive = memory.inclusive_usage()
+        self.assertEqual(usage['heavy'].size + usage['holder'].size, inclusive['holder'].size)
+
+    def test_nested_creation_charged_to_dependency(self):
+        memory = self.tracker()
+        ctx = Pytel({'heavy': Heavy, 'holder': LazyHolder}, memory=memory)
+        ctx.holder
+        usage = memory.usage()
+        self.assertGreater(usage['heavy'].size, 1000 * 1000)
+        self.assertLess(usage['holder'].size, usage['heavy'].size / 10)
+
+    def test_transient_accumulates(self):
+        memory = self.tracker()
+        ctx = Pytel({'heavy': service(Heavy, scope='transient')}, memory=memory)
+        first = ctx.heavy
+        once = memory.usage()['heavy'].size
+        second = ctx.heavy
+        self.assertGreater(memory.usage()['heavy'].size, once * 1.5)
+        self.assertEqual(2, memory.usage()['heavy'].calls)
+        self.assertIsNot(first, second)
+
+    def test_report(self):
+        ctx = Pytel({'heavy': Heavy, 'holder': Holder, 'b': B}, memory=self.tracker())
+        ctx.warm_up(max_workers=1)
+        lines = ctx.memory_report(top=2).splitlines()
+        self.assertEqual(4, len(lines))
+        self.assertTrue(lines[2].endswith(' heavy'))
+
+    def test_report_of_own_services(self):
+        memory = self.tracker()
+        parent = Pytel({'heavy': Heavy}, memory=memory)
+        child = Pytel({'holder': Holder}, parent, memory=memory)
+        child.holder
+        self.assertNotIn('heavy', child.memory_report())
+        self.assertEqual({'heavy', 'holder'}, set(memory.usage()))
+
+    def test_template(self):
+        memory = self.tracker()
+        template = PytelTemplate({'a': A}, memory=memory)
+        template.create().a
+        self.assertIn('a', memory.usage())
+
+    def test_close_stops_tracing_it_started(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc was started outside the test')
+        memory = MemoryTracker()
+        self.assertTrue(tracemalloc.is_tracing())
+        other = MemoryTracker()
+        other.close()
+        self.assertTrue(tracemalloc.is_tracing())
+        memory.close()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_not_tracking(self):
+        self.assertRaises(ValueError, lambda: Pytel({'a': A}).memory_report())
@@ -85,3 +85,18 @@ class TestObjectDescriptor(TestCase):
         descr = ObjectDescriptor.from_callable('a', returns_none)
         descr.resolve_dependencies(None, contextlib.ExitStack())
         self.assertRaises(ValueError, lambda: descr.instance)
+
+    def test_slots(self):
+        descr = ObjectDescriptor.from_object('a', "str")
+        self.assertFalse(hasattr(descr, '__dict__'))
+
+    def test_release_references(self):
+        def factory() -> str:
+            return 'a'
+
+        descr = ObjectDescriptor.from_callable('a', factory)
+        descr.resolve_dependencies(None, contextlib.ExitStack(), release_references=True)
+        self.assertEqual('a', descr.instance)
+        self.assertIsNone(descr._factory)
+        self.assertIsNone(descr._exit_stack)
+        self.assertEqual('a', descr.instance)
@@ -0,0 +1,58 @@
+import contextlib
+import json
+import os
+import tempfile
+import time
+from unittest import TestCase
+
+from pytel import Profiler, Pytel
+from .test_pytel import A, B, C, E
+
+
+def slow_a() -> A:
+    time.sleep(0.02)
+    return A()
+
+
+class TestProfiler(TestCase):
+    def test_records_steps(self):
+        @contextlib.contextmanager
+        def b() -> B:
+            yield B()
+
+        profiler = Profiler()
+        with Pytel({'a': slow_a, 'b': b, 'c': C, 'e': E}, profiler=profiler) as ctx:
+            ctx.e
+        categories = {(event.name, event.category) for event in profiler.events}
+        self.assertTrue({('a', 'introspection'), ('e', 'introspection')} <= categories)
+        self.assertIn('validation', {category for _, category in categories})
+        self.assertTrue({('a', 'factory'), ('c', 'factory'), ('e', 'factory')} <= categories)
+        self.assertTrue({('b', 'enter'), ('b', 'exit')} <= categories)
+
+    def test_critical_path_and_inclusive_times(self):
+        profiler = Profiler()
+        ctx = Pytel({'a': slow_a, 'b': B, 'c': C, 'e': E}, profiler=profiler)
+        ctx.e
+        self.assertEqual(['a', 'c', 'e'], [name for name, _ in profiler.critical_path()])
+        inclusive = profiler.inclusive_times()
+        self.assertGreaterEqual(inclusive['e'], inclusive['c'])
+        self.assertGreaterEqual(inclusive['c'], 0.02)
+        self.assertLess(inclusive['b'], 0.02)
+        self.assertIn('Critical path', profiler.report())
+
+    def test_chrome_trace(self):
+        profiler = Profiler()
+        Pytel({'a': slow_a}, profiler=profiler).a
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            profiler.write_chrome_trace(path)
+            with open(path) as f:
+                trace = json.load(f)
+        factory = [event for event in trace['traceEvents'] if event['cat'] == 'factory']
+        self.assertEqual('a', factory[0]['name'])
+        self.assertEqual('X', factory[0]['ph'])
+        self.assertGreaterEqual(factory[0]['dur'], 20000)
+
+    def test_disabled_by_default(self):
+        ctx = Pytel({'a': A})
+        self.assertIsNone(ctx._objects['a']._profiler)
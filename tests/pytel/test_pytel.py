@@ -1,3 +1,5 @@
+import gc
+import weakref
 import contextlib
 from unittest import TestCase
 from unittest.mock import patch, Mock
@@ -20,6 +22,21 @@ class C:
         self.a = a
 
 
+class SubA(A):
+    pass
+
+
+class D:
+    def __init__(self, c: C):
+        self.c = c
+
+
+class E:
+    def __init__(self, b: B, c: C):
+        self.b = b
+        self.c = c
+
+
 class test_Pytel(TestCase):
     # other tests
 
@@ -73,6 +90,11 @@ class test_Pytel(TestCase):
 
         self.assertRaises(ValueError, lambda: Pytel(Configurer()))
 
+    def test_method_names(self):
+        self.assertRaises(ValueError, lambda: Pytel({'replace': A}))
+        self.assertRaises(ValueError, lambda: Pytel({'warm_up': A}, roots=['warm_up']))
+        self.assertIsInstance(Pytel({'a': A, 'items': B}).a, A)
+
     def test_duplicate_names(self):
         self.assertRaises(KeyError, lambda: Pytel([{
             'a': A
@@ -191,3 +213,43 @@ class test_Pytel(TestCase):
     def test_getattr_with_attribute_error(self):
         p = Pytel([])
         self.assertRaises(AttributeError, lambda: p.a)
+
+    def test_release_references_collects_factory(self):
+        class Factory:
+            def __call__(self, a: A) -> C:
+                return C(a)
+
+        factory = Factory()
+        ref = weakref.ref(factory)
+        ctx = Pytel({'a': A, 'c': factory}, release_references=True)
+        del factory
+        self.assertIsNotNone(ref())
+        self.assertIsInstance(ctx.c, C)
+        gc.collect()
+        self.assertIsNone(ref())
+        self.assertIsNone(ctx._objects['c']._factory)
+        self.assertIs(ctx.a, ctx.c.a)
+
+    def test_getattr_caches_instance(self):
+        ctx = Pytel({'a': A})
+        a = ctx.a
+        self.assertIs(a, ctx.__dict__['a'])
+        with patch.object(Pytel, '_find') as find:
+            self.assertIs(a, ctx.a)
+            find.assert_not_called()
+
+    def test_find_in_ancestor_is_remembered(self):
+        root = Pytel({'a': A})
+        ctx = root
+        for _ in range(5):
+            ctx = Pytel({}, parent=ctx)
+        descr = ctx._find('a')
+        self.assertIs(root._objects['a'], descr)
+        self.assertIs(descr, ctx._inherited['a'])
+        self.assertIs(descr, ctx._parent._inherited['a'])
+
+    def test_own_object_shadows_parent(self):
+        parent = Pytel({'a': A})
+        child = Pytel({'a': B}, parent=parent)
+        self.assertIsInstance(child.a, B)
+        self.assertIsInstance(parent.a, A)
@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+import textwrap
+from unittest import TestCase
+
+from pytel import Lazy, LazyProxy, Pytel, Reference, service
+from .test_pytel import A, C
+
+
+class TestReference(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.module = f'pytel_reference_{id(self)}'
+        with open(os.path.join(self.dir.name, f'{self.module}.py'), 'w') as f:
+            f.write(textwrap.dedent('''
+                from tests.pytel.test_pytel import C
+
+                imports = []
+                imports.append(True)
+
+
+                def make_c(a):
+                    return C(a)
+
+
+                class Factories:
+                    @staticmethod
+                    def make_c(a):
+                        return C(a)
+
+                not_callable = 1
+            '''))
+        sys.path.insert(0, self.dir.name)
+
+    def tearDown(self):
+        sys.path.remove(self.dir.name)
+        sys.modules.pop(self.module, None)
+        self.dir.cleanup()
+
+    def test_import_deferred_until_resolution(self):
+        ctx = Pytel({'a': A, 'c': Reference(f'{self.module}:make_c', C, {'a': A})})
+        self.assertNotIn(self.module, sys.modules)
+        self.assertIs(C, ctx._objects['c'].object_type)
+        self.assertIs(ctx.a, ctx.c.a)
+        self.assertIn(self.module, sys.modules)
+
+    def test_qualified_name(self):
+        ctx = Pytel({'a': A, 'c': Reference(f'{self.module}:Factories.make_c', C, {'a': A})})
+        self.assertIsInstance(ctx.c, C)
+
+    def test_checked_against_declarations(self):
+        self.assertRaises(ValueError, lambda: Pytel({'c': Reference(f'{self.module}:make_c', C, {'a': A})}))
+
+    def test_lazy_dependency(self):
+        ctx = Pytel({'a': A, 'c': Reference(f'{self.module}:make_c', C, {'a': Lazy[A]})})
+        self.assertIsInstance(ctx.c.a, LazyProxy)
+
+    def test_with_options(self):
+        ctx = Pytel({'a': A, 'c': service(Reference(f'{self.module}:make_c', C, {'a': A}), scope='transient')})
+        self.assertIsNot(ctx.c, ctx.c)
+
+    def test_preimport(self):
+        ctx = Pytel({'a': A, 'c': Reference(f'{self.module}:make_c', C, {'a': A})})
+        ctx.preimport().join()
+        self.assertIn(self.module, sys.modules)
+        self.assertEqual([True], sys.modules[self.module].imports)
+
+    def test_preimport_errors_surface_on_resolution(self):
+        ctx = Pytel({'a': A, 'c': Reference('pytel_no_such_module:make_c', C, {'a': A})})
+        ctx.preimport().join()
+        self.assertRaises(ImportError, lambda: ctx.c)
+
+    def test_not_callable(self):
+        ctx = Pytel({'c': Reference(f'{self.module}:not_callable', C)})
+        self.assertRaises(TypeError, lambda: ctx.c)
+
+    def test_invalid_path(self):
+        self.assertRaises(ValueError, lambda: Reference('module.make_c', C))
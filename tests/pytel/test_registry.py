@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+from pytel import Pytel, PytelTemplate
+from pytel.registry import TypeIndex
+from pytel.context import ObjectDescriptor
+from .test_pytel import A, B, C, SubA
+
+
+class Wrapper(A):
+    def __init__(self, a: A):
+        self.a = a
+
+
+class TestTypeIndex(TestCase):
+    def test_indexes_mro(self):
+        descr = ObjectDescriptor.from_('sub', SubA)
+        index = TypeIndex([descr])
+        self.assertEqual([descr], index.providers(SubA))
+        self.assertEqual([descr], index.providers(A))
+        self.assertEqual([], index.providers(object))
+        self.assertEqual([], index.providers(B))
+
+
+class TestResolveByType(TestCase):
+    def test_resolves_subclass_under_other_name(self):
+        ctx = Pytel({'sub': SubA, 'x': C}, by_type=True)
+        self.assertIs(ctx.sub, ctx.x.a)
+
+    def test_by_name_by_default(self):
+        self.assertRaises(ValueError, lambda: Pytel({'sub': SubA, 'x': C}))
+
+    def test_ambiguous(self):
+        with self.assertRaises(ValueError) as e:
+            Pytel({'first': A, 'second': SubA, 'c': C}, by_type=True)
+        self.assertIn('first, second', str(e.exception))
+
+    def test_name_breaks_tie(self):
+        ctx = Pytel({'a': A, 'other': SubA, 'c': C}, by_type=True)
+        self.assertIs(ctx.a, ctx.c.a)
+
+    def test_unresolved(self):
+        self.assertRaises(ValueError, lambda: Pytel({'c': C}, by_type=True))
+
+    def test_nearest_context_wins(self):
+        parent = Pytel({'a': A, 'b': B})
+        ctx = Pytel({'sub': SubA, 'c': C}, parent, by_type=True)
+        self.assertIs(ctx.sub, ctx.c.a)
+
+    def test_falls_back_to_parent(self):
+        parent = Pytel({'base': A})
+        ctx = Pytel({'c': C}, parent, by_type=True)
+        self.assertIs(parent.base, ctx.c.a)
+
+    def test_does_not_depend_on_itself(self):
+        ctx = Pytel({'inner': SubA, 'outer': Wrapper}, by_type=True)
+        self.assertIs(ctx.inner, ctx.outer.a)
+
+    def test_cycle(self):
+        class D:
+            def __init__(self, c: C):
+                pass
+
+        def c(d: D) -> C:
+            pass
+
+        self.assertRaises(ValueError, lambda: Pytel({'x': c, 'y': D}, by_type=True))
+
+    def test_lookups_are_cached(self):
+        ctx = Pytel({'sub': SubA, 'x': C, 'y': C}, by_type=True)
+        self.assertEqual({A: [ctx._objects['sub']]}, ctx._providers)
+
+    def test_template(self):
+        template = PytelTemplate({'x': C}, Pytel({'sub': SubA}), by_type=True)
+        first = template.create()
+        self.assertIs(template.parent.sub, first.x.a)
+        self.assertIsNot(first.x, template.create().x)
@@ -0,0 +1,177 @@
+import asyncio
+import contextlib
+from unittest import TestCase
+
+from pytel import Pytel, ShutdownError
+from .test_pytel import A, B, C, D, SubA
+
+
+class TestReplace(TestCase):
+    def test_rebuilds_dependents_only(self):
+        ctx = Pytel({'a': A, 'b': B, 'c': C, 'd': D})
+        b, c, d = ctx.b, ctx.c, ctx.d
+        ctx.replace('a', SubA)
+        self.assertIsInstance(ctx.a, SubA)
+        self.assertIs(ctx.a, ctx.c.a)
+        self.assertIsNot(c, ctx.c)
+        self.assertIsNot(d, ctx.d)
+        self.assertIs(ctx.c, ctx.d.c)
+        self.assertIs(b, ctx.b)
+
+    def test_closes_stale_instances_dependents_first(self):
+        closed = []
+
+        def closing(name, t):
+            @contextlib.contextmanager
+            def factory() -> t:
+                yield t()
+                closed.append(name)
+
+            return factory
+
+        def c(a: A) -> C:
+            @contextlib.contextmanager
+            def manager():
+                yield C(a)
+                closed.append('c')
+
+            return manager()
+
+        ctx = Pytel({'a': closing('a', A), 'b': closing('b', B), 'c': c})
+        ctx.c, ctx.b
+        ctx.replace('a', SubA)
+        self.assertEqual(['c', 'a'], closed)
+        ctx.c
+        ctx.close()
+        self.assertEqual(['c', 'a', 'c', 'b'], closed)
+
+    def test_value(self):
+        a = A()
+        ctx = Pytel({'a': A, 'c': C})
+        ctx.replace('a', a)
+        self.assertIs(a, ctx.c.a)
+
+    def test_wrong_type_leaves_context_unchanged(self):
+        ctx = Pytel({'a': A, 'c': C})
+        c = ctx.c
+        self.assertRaises(ValueError, lambda: ctx.replace('a', B))
+        self.assertIs(c, ctx.c)
+        self.assertIs(A, ctx._objects['a'].object_type)
+
+    def test_unresolved_dependency(self):
+        ctx = Pytel({'a': A, 'c': C})
+        self.assertRaises(ValueError, lambda: ctx.replace('c', D))
+        self.assertIsInstance(ctx.c, C)
+
+    def test_cycle(self):
+        def a(c: C) -> A:
+            return A()
+
+        ctx = Pytel({'a': A, 'c': C})
+        self.assertRaises(ValueError, lambda: ctx.replace('a', a))
+        self.assertIsInstance(ctx.c.a, A)
+
+    def test_unknown(self):
+        self.assertRaises(KeyError, lambda: Pytel({'a': A}).replace('b', B))
+
+    def test_release_references(self):
+        ctx = Pytel({'a': A}, release_references=True)
+        self.assertRaises(ValueError, lambda: ctx.replace('a', SubA))
+
+    def test_by_type_ambiguity(self):
+        def c(x: A) -> C:
+            return C(x)
+
+        ctx = Pytel({'a': A, 'b': B, 'c': c}, by_type=True)
+        self.assertRaises(ValueError, lambda: ctx.replace('b', SubA))
+        ctx.replace('a', SubA)
+        self.assertIsInstance(ctx.c.a, SubA)
+
+    def test_child_sees_new_service(self):
+        parent = Pytel({'a': A})
+        child = Pytel({'c': C}, parent)
+        parent.replace('a', SubA)
+        self.assertIsInstance(child.c.a, SubA)
+
+    def test_child_forgets_old_instance(self):
+        parent = Pytel({'a': A})
+        child = Pytel({'b': B}, parent)
+        old = child.a
+        parent.replace('a', SubA)
+        self.assertIsInstance(child.a, SubA)
+        self.assertIs(parent.a, child.a)
+        self.assertIsNot(old, child.a)
+
+    def test_live_children_resolve_new_instance(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> A:
+            a = A()
+            yield a
+            closed.append(a)
+
+        parent = Pytel({'a': factory})
+        child = Pytel({'c': C}, parent)
+        grandchild = Pytel({'b': B}, child)
+        old = grandchild.c.a
+        parent.replace('a', SubA)
+        self.assertEqual([old], closed)
+        self.assertIsInstance(child.c.a, SubA)
+        self.assertIs(parent.a, child.c.a)
+        self.assertIs(child.c, grandchild.c)
+
+    def test_rejected_by_child_leaves_contexts_unchanged(self):
+        class NeedsSubA:
+            def __init__(self, a: SubA):
+                self.a = a
+
+        parent = Pytel({'a': SubA})
+        child = Pytel({'e': NeedsSubA}, parent)
+        e = child.e
+        self.assertRaises(ValueError, lambda: parent.replace('a', A))
+        self.assertIs(e, child.e)
+        self.assertIs(parent.a, child.e.a)
+        self.assertIsInstance(parent.a, SubA)
+
+    def test_compiled(self):
+        ctx = Pytel({'a': A, 'c': C, 'd': D})
+        ctx.compile()
+        ctx.d
+        with self.assertLogs('pytel', 'WARNING'):
+            ctx.replace('a', SubA)
+        self.assertIsInstance(ctx.d.c.a, SubA)
+
+    def test_close_error(self):
+        @contextlib.contextmanager
+        def a() -> A:
+            yield A()
+            raise RuntimeError()
+
+        ctx = Pytel({'a': a})
+        ctx.a
+        with self.assertRaises(ShutdownError) as e:
+            ctx.replace('a', SubA)
+        self.assertEqual(['a'], list(e.exception.errors.keys()))
+        self.assertIsInstance(ctx.a, SubA)
+
+    def test_async(self):
+        closed = []
+
+        class Resource(A):
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *args):
+                closed.append(self)
+
+        async def main():
+            ctx = Pytel({'a': Resource, 'c': C})
+            old = (await ctx.async_get('c')).a
+            with self.assertRaises(TypeError):
+                ctx.replace('a', SubA)
+            await ctx.async_replace('a', SubA)
+            self.assertEqual([old], closed)
+            self.assertIsInstance((await ctx.async_get('c')).a, SubA)
+
+        asyncio.run(main())
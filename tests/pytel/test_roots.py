@@ -0,0 +1,87 @@
+import threading
+from unittest import TestCase
+from unittest.mock import patch
+
+from pytel import Pytel
+from pytel.context import ObjectDescriptor
+from .test_pytel import A, B, C, D
+
+
+class TestRoots(TestCase):
+    def test_builds_reachable_only(self):
+        ctx = Pytel({'a': A, 'b': B, 'c': C, 'd': D}, roots=['c'])
+        self.assertEqual({'a', 'c'}, set(ctx.keys()))
+        self.assertIn('d', ctx)
+        self.assertNotIn('x', ctx)
+
+    def test_deferred_built_on_access(self):
+        ctx = Pytel({'a': A, 'b': B, 'c': C, 'd': D}, roots=['c'])
+        c = ctx.c
+        self.assertIs(c, ctx.d.c)
+        self.assertEqual({'a', 'c', 'd'}, set(ctx.keys()))
+
+    def test_invalid_deferred_fails_on_access(self):
+        def broken(x: A) -> B:
+            return B()
+
+        ctx = Pytel({'a': A, 'c': C, 'b': broken}, roots=['c'])
+        self.assertIsInstance(ctx.c, C)
+        self.assertRaises(ValueError, lambda: ctx.b)
+        self.assertIn('b', ctx)
+        self.assertNotIn('b', ctx.keys())
+
+    def test_invalid_root(self):
+        self.assertRaises(ValueError, lambda: Pytel({'c': C}, roots=['c']))
+
+    def test_unknown_root(self):
+        self.assertRaises(KeyError, lambda: Pytel({'a': A}, roots=['b']))
+
+    def test_cycle_in_deferred(self):
+        class E:
+            def __init__(self, f: 'F'):
+                pass
+
+        class F:
+            def __init__(self, e: E):
+                pass
+
+        def e(f: F) -> E:
+            pass
+
+        def f(e: E) -> F:
+            pass
+
+        ctx = Pytel({'a': A, 'e': e, 'f': f}, roots=['a'])
+        self.assertRaises(ValueError, lambda: ctx.e)
+
+    def test_introspects_reachable_only(self):
+        with patch('pytel.pytel.ObjectDescriptor.from_', wraps=ObjectDescriptor.from_) as from_:
+            Pytel({'a': A, 'b': B, 'c': C, 'd': D}, roots=['c'])
+        self.assertEqual({'a', 'c'}, {call.args[0] for call in from_.call_args_list})
+
+    def test_child_uses_deferred_of_parent(self):
+        parent = Pytel({'a': A, 'b': B}, roots=['b'])
+        child = Pytel({'c': C}, parent)
+        self.assertIs(parent.a, child.c.a)
+
+    def test_replace_deferred(self):
+        class SubA(A):
+            pass
+
+        ctx = Pytel({'a': A, 'b': B}, roots=['b'])
+        ctx.replace('a', SubA)
+        self.assertIsInstance(ctx.a, SubA)
+
+    def test_concurrent_access(self):
+        ctx = Pytel({'a': A, 'b': B, 'c': C, 'd': D}, roots=['b'])
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(ctx.d)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, len(results))
+        self.assertTrue(all(d is results[0] for d in results))
+
+    def test_not_with_by_type(self):
+        self.assertRaises(ValueError, lambda: Pytel({'a': A}, roots=['a'], by_type=True))
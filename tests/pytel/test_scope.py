@@ -0,0 +1,175 @@
+import contextlib
+import gc
+import threading
+from unittest import TestCase
+
+from pytel import Pytel, PytelTemplate, service
+from pytel.context import ObjectDescriptor
+from pytel.scope import Pool
+from .test_pytel import A, B, C
+
+
+class TestScopes(TestCase):
+    def test_transient(self):
+        ctx = Pytel({'a': service(A, scope='transient'), 'c': service(C, scope='transient')})
+        self.assertIsNot(ctx.a, ctx.a)
+        self.assertIsNot(ctx.c, ctx.c)
+        self.assertIsNot(ctx.c.a, ctx.c.a)
+
+    def test_singleton_depending_on_transient(self):
+        ctx = Pytel({'a': service(A, scope='transient'), 'c': C})
+        self.assertIs(ctx.c, ctx.c)
+        self.assertIsNot(ctx.c.a, ctx.a)
+
+    def test_transient_depending_on_singleton(self):
+        ctx = Pytel({'a': A, 'c': service(C, scope='transient')})
+        self.assertIs(ctx.c.a, ctx.c.a)
+
+    def test_thread(self):
+        ctx = Pytel({'a': A, 'c': service(C, scope='thread')})
+        c = ctx.c
+        self.assertIs(c, ctx.c)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(ctx.c))
+        thread.start()
+        thread.join()
+        self.assertIsNot(c, other[0])
+        self.assertIs(c.a, other[0].a)
+
+    def test_transient_context_manager_rejected(self):
+        @contextlib.contextmanager
+        def factory() -> A:
+            yield A()
+
+        with Pytel({'a': service(factory, scope='transient')}) as ctx:
+            self.assertRaises(TypeError, lambda: ctx.a)
+
+    def test_thread_context_managers_closed_when_thread_ends(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> A:
+            a = A()
+            yield a
+            closed.append(a)
+
+        with Pytel({'a': service(factory, scope='thread')}) as ctx:
+            other = []
+            thread = threading.Thread(target=lambda: other.append(ctx.a))
+            thread.start()
+            thread.join()
+            del thread
+            gc.collect()
+            self.assertEqual(other, closed)
+            a = ctx.a
+        self.assertEqual(other + [a], closed)
+
+    def test_warm_up_skips_scoped(self):
+        created = []
+
+        def factory() -> A:
+            created.append(True)
+            return A()
+
+        ctx = Pytel({'a': service(factory, scope='transient'), 'c': C})
+        ctx.warm_up()
+        self.assertEqual([True], created)
+
+    def test_compiled(self):
+        ctx = Pytel({'a': service(A, scope='transient'), 'c': C, 'd': service(C, scope='transient')})
+        ctx.compile()
+        self.assertIsNot(ctx.c.a, ctx.d.a)
+        self.assertIsNot(ctx.d, ctx.d)
+
+    def test_template_scopes_are_separate(self):
+        template = PytelTemplate({'a': service(A, scope='thread')})
+        self.assertIsNot(template.create().a, template.create().a)
+
+    def test_unknown_scope(self):
+        self.assertRaises(ValueError, lambda: service(A, scope='request'))
+
+    def test_value_is_not_scoped(self):
+        self.assertRaises(ValueError, lambda: Pytel({'a': service(A(), scope='transient')}))
+
+
+class TestPool(TestCase):
+    def test_reuses_released(self):
+        ctx = Pytel({'a': service(A, scope='pooled', pool_size=2)})
+        with ctx.acquire('a') as first:
+            with ctx.acquire('a') as second:
+                self.assertIsNot(first, second)
+        with ctx.acquire('a') as third:
+            self.assertIn(third, (first, second))
+
+    def test_timeout(self):
+        ctx = Pytel({'a': service(A, scope='pooled', pool_size=1, pool_timeout=0.01)})
+        with ctx.acquire('a'):
+            self.assertRaises(TimeoutError, lambda: ctx.acquire('a').__enter__())
+            self.assertRaises(TimeoutError, lambda: ctx.acquire('a', timeout=0).__enter__())
+
+    def test_waits_for_release(self):
+        ctx = Pytel({'a': service(A, scope='pooled', pool_size=1)})
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def borrow():
+            with ctx.acquire('a'):
+                acquired.set()
+                release.wait()
+
+        thread = threading.Thread(target=borrow)
+        thread.start()
+        acquired.wait()
+        release.set()
+        with ctx.acquire('a', timeout=5) as a:
+            self.assertIsInstance(a, A)
+        thread.join()
+
+    def test_failed_creation_frees_slot(self):
+        calls = []
+
+        def factory() -> A:
+            calls.append(True)
+            if len(calls) == 1:
+                raise RuntimeError()
+            return A()
+
+        ctx = Pytel({'a': service(factory, scope='pooled', pool_size=1, pool_timeout=0)})
+        self.assertRaises(RuntimeError, lambda: ctx.acquire('a').__enter__())
+        with ctx.acquire('a') as a:
+            self.assertIsInstance(a, A)
+
+    def test_closed_with_context(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> A:
+            yield A()
+            closed.append(True)
+
+        with Pytel({'a': service(factory, scope='pooled', pool_size=2)}) as ctx:
+            with ctx.acquire('a'), ctx.acquire('a'):
+                pass
+        self.assertEqual([True, True], closed)
+
+    def test_not_injectable(self):
+        self.assertRaises(ValueError, lambda: Pytel({'a': service(A, scope='pooled', pool_size=1), 'c': C}))
+
+    def test_attribute_access(self):
+        ctx = Pytel({'a': service(A, scope='pooled', pool_size=1)})
+        self.assertRaises(TypeError, lambda: ctx.a)
+
+    def test_acquire_singleton(self):
+        self.assertRaises(TypeError, lambda: Pytel({'b': B}).acquire('b').__enter__())
+
+    def test_release_foreign_instance(self):
+        descr = ObjectDescriptor.from_('a', A)
+        descr.resolve_dependencies(None, contextlib.ExitStack())
+        pool = Pool(descr, 1, None)
+        a = pool.acquire()
+        self.assertRaises(ValueError, lambda: pool.release(A()))
+        pool.release(a)
+        self.assertRaises(ValueError, lambda: pool.release(a))
+
+    def test_pool_size_required(self):
+        self.assertRaises(ValueError, lambda: service(A, scope='pooled'))
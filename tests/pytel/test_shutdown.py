@@ -0,0 +1,195 @@
+import asyncio
+import threading
+import time
+from unittest import TestCase
+
+from pytel import Pytel, ShutdownError, service
+
+
+class Resource:
+    def __init__(self, log: list, name: str, delay: float = 0, error: Exception = None):
+        self.log = log
+        self.name = name
+        self.delay = delay
+        self.error = error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_details):
+        time.sleep(self.delay)
+        self.log.append(self.name)
+        if self.error:
+            raise self.error
+        return False
+
+
+class AsyncResource(Resource):
+    def __enter__(self):
+        raise AssertionError('sync enter')
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_details):
+        await asyncio.sleep(self.delay)
+        self.log.append(self.name)
+        return False
+
+
+def services(log: list, cls=Resource, **kwargs) -> dict:
+    def a() -> cls:
+        return cls(log, 'a', **kwargs.get('a', {}))
+
+    def b(a: cls) -> Resource:
+        return Resource(log, 'b', **kwargs.get('b', {}))
+
+    def c(a: cls) -> Resource:
+        return Resource(log, 'c', **kwargs.get('c', {}))
+
+    def d(b: Resource, c: Resource) -> str:
+        return 'not a context manager'
+
+    def e(d: str) -> Resource:
+        return Resource(log, 'e', **kwargs.get('e', {}))
+
+    return {'a': a, 'b': b, 'c': c, 'd': d, 'e': e}
+
+
+class TestShutdown(TestCase):
+    def test_dependents_close_first(self):
+        log = []
+        ctx = Pytel(services(log))
+        ctx.warm_up()
+        ctx.shutdown(max_workers=4)
+        self.assertEqual('e', log[0])
+        self.assertEqual({'b', 'c'}, set(log[1:3]))
+        self.assertEqual('a', log[3])
+
+    def test_independent_services_close_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        class Waiting(Resource):
+            def __exit__(self, *exc_details):
+                barrier.wait()
+                return super().__exit__(*exc_details)
+
+        log = []
+
+        def x() -> Waiting:
+            return Waiting(log, 'x')
+
+        def y() -> Waiting:
+            return Waiting(log, 'y')
+
+        ctx = Pytel({'x': x, 'y': y})
+        ctx.warm_up()
+        ctx.shutdown(max_workers=2)
+        self.assertEqual({'x', 'y'}, set(log))
+
+    def test_timeout_is_reported(self):
+        log = []
+        ctx = Pytel(services(log, e={'delay': 1}))
+        ctx.warm_up()
+        with self.assertLogs('pytel', 'WARNING') as logs, self.assertRaises(ShutdownError) as e:
+            ctx.shutdown(timeouts={'e': 0.05})
+        self.assertIsInstance(e.exception.errors['e'], TimeoutError)
+        # dependencies of e are left open, even when the context is closed again
+        ctx.close()
+        self.assertEqual([], log)
+        self.assertEqual(3, len(logs.records))
+
+    def test_errors_are_aggregated(self):
+        log = []
+        ctx = Pytel(services(log, b={'error': RuntimeError('b')}, c={'error': RuntimeError('c')}))
+        ctx.warm_up()
+        with self.assertRaises(ShutdownError) as e:
+            ctx.shutdown()
+        self.assertEqual({'b', 'c'}, set(e.exception.errors.keys()))
+        self.assertEqual(['a'], log[-1:])
+
+    def test_unresolved_services_are_skipped(self):
+        log = []
+        ctx = Pytel(services(log))
+        ctx.c
+        ctx.shutdown()
+        self.assertEqual(['c', 'a'], log)
+
+    def test_close_after_shutdown_closes_nothing(self):
+        log = []
+        with Pytel(services(log)) as ctx:
+            ctx.warm_up()
+            ctx.shutdown()
+        self.assertEqual(4, len(log))
+
+    def test_async_shutdown(self):
+        log = []
+
+        async def run():
+            ctx = Pytel(services(log, AsyncResource, e={'delay': 1}))
+            await ctx.async_warm_up()
+            with self.assertRaises(ShutdownError) as e:
+                await ctx.async_shutdown(timeouts={'e': 0.05})
+            self.assertIsInstance(e.exception.errors['e'], TimeoutError)
+            self.assertEqual([], log)
+
+        asyncio.run(run())
+        # the default executor finished closing e, its dependencies were left open
+        self.assertEqual(['e'], log)
+
+    def test_async_timeout_cancels_async_resource(self):
+        log = []
+
+        async def run():
+            ctx = Pytel(services(log, AsyncResource, a={'delay': 1}))
+            await ctx.async_warm_up()
+            with self.assertRaises(ShutdownError) as e:
+                await ctx.async_shutdown(timeouts={'a': 0.05})
+            self.assertIsInstance(e.exception.errors['a'], TimeoutError)
+
+        asyncio.run(run())
+        self.assertEqual({'b', 'c', 'e'}, set(log))
+
+    def test_async_resource_in_sync_shutdown(self):
+        log = []
+
+        async def run():
+            ctx = Pytel(services(log, AsyncResource))
+            await ctx.async_warm_up()
+            with self.assertRaises(ShutdownError) as e:
+                ctx.shutdown()
+            self.assertIsInstance(e.exception.errors['a'], TypeError)
+            await ctx.aclose()
+
+        asyncio.run(run())
+        self.assertEqual('a', log[-1])
+
+    def test_scoped_close_before_dependencies(self):
+        for scope in ['thread', 'evictable']:
+            with self.subTest(scope):
+                log = []
+                ctx = Pytel({**services(log), 'b': service(services(log)['b'], scope=scope)})
+                ctx.b
+                ctx.shutdown(max_workers=2)
+                self.assertEqual(['b', 'a'], log)
+
+    def test_scoped_without_context_manager_keeps_order(self):
+        log = []
+
+        def d(a: Resource) -> str:
+            return 'not a context manager'
+
+        def e(d: str) -> Resource:
+            return Resource(log, 'e', delay=0.05)
+
+        ctx = Pytel({'a': services(log)['a'], 'd': service(d, scope='transient'), 'e': e})
+        ctx.e
+        ctx.shutdown(max_workers=2)
+        self.assertEqual(['e', 'a'], log)
+
+    def test_async_scoped_close_before_dependencies(self):
+        log = []
+        ctx = Pytel({**services(log), 'b': service(services(log)['b'], scope='thread')})
+        ctx.b
+        asyncio.run(ctx.async_shutdown())
+        self.assertEqual(['b', 'a'], log)
@@ -0,0 +1,56 @@
+import contextlib
+from unittest import TestCase
+from unittest.mock import patch
+
+from pytel import Pytel, PytelTemplate
+from .test_pytel import A, B, C
+
+
+class TestPytelTemplate(TestCase):
+    def test_create_new_instances(self):
+        template = PytelTemplate({'b': B, 'c': C}, Pytel({'a': A}))
+        first = template.create()
+        second = template.create()
+        self.assertIsInstance(first.c, C)
+        self.assertIsNot(first.c, second.c)
+        self.assertIsNot(first.b, second.b)
+        self.assertIs(first.c.a, second.c.a)
+        self.assertIs(template.parent.a, first.c.a)
+
+    def test_validates_once(self):
+        template = PytelTemplate({'c': C}, Pytel({'a': A}))
+        with patch('pytel.context.ObjectDescriptor.from_') as from_, \
+                patch('pytel.pytel.Pytel._check') as check:
+            template.create().c
+            from_.assert_not_called()
+            check.assert_not_called()
+
+    def test_invalid_configuration_raises(self):
+        self.assertRaises(ValueError, lambda: PytelTemplate({'c': C}, Pytel({})))
+
+    def test_values_are_shared(self):
+        a = A()
+        template = PytelTemplate({'a': a, 'c': C})
+        self.assertIs(a, template.create().c.a)
+
+    def test_scope_closes_own_instances(self):
+        closed = []
+
+        @contextlib.contextmanager
+        def factory() -> B:
+            yield B()
+            closed.append(True)
+
+        template = PytelTemplate({'b': factory})
+        with template.create() as ctx:
+            ctx.b
+        self.assertEqual([True], closed)
+        with template.create():
+            pass
+        self.assertEqual([True], closed)
+
+    def test_keys(self):
+        template = PytelTemplate({'a': A})
+        self.assertEqual(['a'], list(template.keys()))
+        self.assertEqual(1, len(template))
+        self.assertTrue('a' in template)
@@ -0,0 +1,76 @@
+import threading
+import time
+from unittest import TestCase
+
+from pytel import Pytel
+from .test_pytel import A
+
+
+class Counted:
+    def __init__(self, counter: list, a: A):
+        time.sleep(0.01)
+        counter.append(1)
+        self.a = a
+
+    def __enter__(self):
+        self.entered = True
+        return self
+
+    def __exit__(self, *exc_details):
+        return False
+
+
+class TestConcurrentResolution(TestCase):
+    threads = 32
+
+    def run_threads(self, target):
+        barrier = threading.Barrier(self.threads)
+        results = []
+
+        def run():
+            barrier.wait()
+            results.append(target())
+
+        threads = [threading.Thread(target=run) for _ in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_factory_called_once(self):
+        for _ in range(10):
+            created = []
+            counter = []
+
+            def a() -> A:
+                created.append(1)
+                return A()
+
+            def counted(a: A) -> Counted:
+                return Counted(counter, a)
+
+            ctx = Pytel({'a': a, 'counted': counted})
+            results = self.run_threads(lambda: ctx._get('counted'))
+            self.assertEqual(1, len(counter))
+            self.assertEqual(1, len(created))
+            self.assertEqual(1, len({id(result) for result in results}))
+            self.assertEqual(1, len(ctx._exit_stack._exit_callbacks))
+
+    def test_getattr_and_warm_up(self):
+        counter = []
+
+        def counted(a: A) -> Counted:
+            return Counted(counter, a)
+
+        ctx = Pytel({'a': A, 'counted': counted})
+        results = self.run_threads(lambda: ctx.warm_up(max_workers=2) or ctx.counted)
+        self.assertEqual(1, len(counter))
+        self.assertEqual(1, len({id(result) for result in results}))
+
+    def test_resolved_read_takes_no_lock(self):
+        ctx = Pytel({'a': A})
+        ctx._get('a')
+        descr = ctx._objects['a']
+        with descr._get_lock():
+            self.assertIsInstance(ctx._get('a'), A)
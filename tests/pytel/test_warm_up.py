@@ -0,0 +1,73 @@
+import contextlib
+import threading
+import time
+from unittest import TestCase
+
+from pytel import Pytel
+from .test_pytel import A, C
+
+
+class TestWarmUp(TestCase):
+    def test_warm_up_resolves_all(self):
+        ctx = Pytel({'a': A, 'c': C})
+        ctx.warm_up(max_workers=2)
+        self.assertIsNotNone(ctx._objects['a']._instance)
+        self.assertIsNotNone(ctx._objects['c']._instance)
+        self.assertIs(ctx.a, ctx.c.a)
+
+    def test_warm_up_serial(self):
+        ctx = Pytel({'a': A, 'c': C})
+        ctx.warm_up(max_workers=1)
+        self.assertIs(ctx._objects['a']._instance, ctx.c.a)
+
+    def test_warm_up_runs_independent_factories_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+
+        def slow() -> int:
+            barrier.wait()
+            return 1
+
+        ctx = Pytel({'a': slow, 'b': slow})
+        ctx.warm_up(max_workers=2)
+        self.assertEqual(1, ctx.a)
+        self.assertEqual(1, ctx.b)
+
+    def test_warm_up_waits_for_dependencies(self):
+        def a() -> int:
+            time.sleep(0.05)
+            return 1
+
+        def b(a: int) -> str:
+            return str(a)
+
+        ctx = Pytel({'a': a, 'b': b})
+        ctx.warm_up(max_workers=4)
+        self.assertEqual('1', ctx.b)
+
+    def test_warm_up_keeps_close_order(self):
+        closed = []
+
+        def managed(name, result):
+            @contextlib.contextmanager
+            def factory():
+                yield result
+                closed.append(name)
+
+            return factory
+
+        def a() -> int:
+            return managed('a', 1)()
+
+        def b(a: int) -> str:
+            return managed('b', str(a))()
+
+        with Pytel({'a': a, 'b': b}) as ctx:
+            ctx.warm_up(max_workers=2)
+        self.assertEqual(['b', 'a'], closed)
+
+    def test_warm_up_raises_factory_error(self):
+        def a() -> int:
+            raise RuntimeError('a')
+
+        ctx = Pytel({'a': a, 'x': A})
+        self.assertRaises(RuntimeError, lambda: ctx.warm_up(max_workers=2))